@@ -62,6 +62,11 @@ def main():
         if live_prices:
             switch_page('markdown to pdf converter')
 
+    with col7:
+        cross_asset = st.button("🧮 Cross Asset Analytics")
+        if cross_asset:
+            switch_page('cross asset analytics')
+
     st.text("")
     st.markdown("**Disclaimer:** ⚠️ This website uses data from third-party APIs. We do not guarantee or warrant the accuracy, completeness, or timeliness of the data. We are not responsible for any errors or omissions in the data, or for any losses or damages that may arise from the use of the data. We do not own or control the API that we use to obtain the data, and we are not affiliated with by the owning company. By using this website, you acknowledge and agree to these terms and conditions. This is not financial advice. ⚠️", unsafe_allow_html=True)
     st.text("")
@@ -81,6 +86,7 @@ def main():
         - **Binance Historical Data SQL Database**: A comprehensive database that leverages the Binance API to provide historical data about various cryptocurrencies.
         - **Compare Crypto & Market ROI**: Utilize the power of Yfinance to compare the return on investment (ROI) of different cryptocurrencies and financial markets.
         - **Crypto Live Prices**: Get real-time price updates of various cryptocurrencies, powered by CoinGecko API.
+        - **Cross Asset Analytics**: Correlations, betas against Bitcoin and realized volatility across every Binance pair, computed after each daily import.
         - **Ethereum Wallet Explorer**: An interactive tool that uses Etherscan API to allow exploration of Ethereum wallets, providing detailed insights and analytics.
 
         This website is built using **Python, Streamlit**, and hosted on a **Linux EC2 AWS server with Nginx**. 
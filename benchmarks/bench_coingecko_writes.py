@@ -0,0 +1,75 @@
+"""
+Benchmark - CoinGecko markets writes: per-row INSERT + log line vs one executemany per page.
+
+Run from the repository root:
+    python -m benchmarks.bench_coingecko_writes
+"""
+import logging
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from extras.coingecko_feed import MARKET_COLUMNS, INSERT_MARKETS, create_markets_table, market_rows, write_markets
+
+COINS = 1000
+PER_PAGE = 250
+REPEATS = 5
+
+def synthetic_payload(coins=COINS):
+    payload = []
+    for i in range(coins):
+        item = {column: random.random() * 10**6 for column in MARKET_COLUMNS}
+        item.update({
+            'id': f'coin-{i}',
+            'symbol': f'c{i}',
+            'name': f'Coin {i}',
+            'image': f'https://example.com/coin-{i}.png',
+            'market_cap_rank': i + 1,
+            'ath_date': '2021-11-10T14:24:11.849Z',
+            'atl_date': '2015-10-20T00:00:00.000Z',
+            'last_updated': '2023-06-01T12:00:00.000Z',
+        })
+        payload.append(item)
+    return payload
+
+def per_row_loop(conn, pages, logger):
+    # The write path connect_to_coingecko used before - one INSERT and one log line per coin
+    cursor = conn.cursor()
+    for data in pages:
+        for item in data:
+            values = tuple(item[column] for column in MARKET_COLUMNS)
+            cursor.execute(INSERT_MARKETS, values)
+            logger.info(f"Data inserted successfully for {item['id']}")
+        conn.commit()
+
+def executemany_pages(conn, pages, logger):
+    for page, data in enumerate(pages, start=1):
+        rows_written = write_markets(conn, market_rows(data))
+        logger.info(f"Page {page}: {rows_written} rows inserted successfully")
+
+def run(write, pages, tmp_dir):
+    timings = []
+    for repeat in range(REPEATS):
+        conn = sqlite3.connect(str(Path(tmp_dir) / f'{write.__name__}_{repeat}.db'))
+        create_markets_table(conn.cursor())
+        logger = logging.getLogger(f'bench.{write.__name__}.{repeat}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(logging.FileHandler(Path(tmp_dir) / f'{write.__name__}_{repeat}.log', mode='w'))
+        started = time.perf_counter()
+        write(conn, pages, logger)
+        timings.append(time.perf_counter() - started)
+        conn.close()
+    return min(timings)
+
+if __name__ == '__main__':
+    payload = synthetic_payload()
+    pages = [payload[i:i + PER_PAGE] for i in range(0, COINS, PER_PAGE)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        baseline = run(per_row_loop, pages, tmp_dir)
+        batched = run(executemany_pages, pages, tmp_dir)
+    print(f"{COINS} coins, best of {REPEATS}")
+    print(f"per-row loop : {baseline * 1000:8.2f} ms")
+    print(f"executemany  : {batched * 1000:8.2f} ms  ({baseline / batched:.1f}x)")
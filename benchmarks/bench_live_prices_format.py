@@ -0,0 +1,93 @@
+"""
+Benchmark - Live prices formatting: element-wise map/string round trip vs the vectorized transform.
+
+Run from the repository root:
+    python -m benchmarks.bench_live_prices_format
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from extras.coingecko_feed import MARKET_COLUMNS
+from extras.process_data_coingecko import SELECTED_COLUMNS, COLUMN_NAMES, INFO_COLUMNS, PERCENTAGE_COLUMNS, transform_markets, style_markets
+
+SIZES = (1000, 10000)
+REPEATS = 5
+
+def synthetic_markets(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.lognormal(10, 6, size=(rows, len(MARKET_COLUMNS))), columns=MARKET_COLUMNS)
+    df['id'] = [f'coin-{i}' for i in range(rows)]
+    df['symbol'] = [f'c{i}' for i in range(rows)]
+    df['name'] = [f'Coin {i}' for i in range(rows)]
+    df['image'] = [f'https://example.com/coin-{i}.png' for i in range(rows)]
+    df['market_cap_rank'] = np.arange(1, rows + 1)
+    for column in ['price_change_percentage_1h_in_currency', 'price_change_percentage_24h_in_currency',
+                   'price_change_percentage_7d_in_currency', 'price_change_percentage_30d_in_currency',
+                   'price_change_percentage_1y_in_currency']:
+        df[column] = rng.normal(0, 20, rows)
+    df.loc[df.sample(frac=0.1, random_state=seed).index, 'max_supply'] = np.nan
+    return df
+
+# Previous implementation - DataFrame.map is the pandas >= 2.1 name of applymap
+def abbreviate_number(num):
+    if pd.isnull(num) or num == 0:
+        return 'None'
+    elif num >= 10**12:
+        return str(round(num / 10**12, 2)) + 'T'
+    elif num >= 10**9:
+        return str(round(num / 10**9, 2)) + 'B'
+    elif num >= 10**6:
+        return str(round(num / 10**6, 2)) + 'M'
+    elif num >= 10**3:
+        return str(round(num / 10**3, 2)) + 'K'
+    else:
+        return str(num)
+
+def color_positive_negative(val):
+    if pd.isnull(val):
+        return ''
+    if isinstance(val, str):
+        val = float(val.replace(",", ""))
+    else:
+        val = float(val)
+    color = 'green' if val > 0 else ('red' if val < 0 else 'grey')
+    return 'background-color: %s' % color
+
+def legacy_transform(df):
+    df = df[SELECTED_COLUMNS].copy()
+    df.columns = COLUMN_NAMES
+    df['Symbol'] = df['Symbol'].str.upper()
+    df['Percentage In Circulation'] = (df['Circulating Supply']/df['Max Supply'])*100
+    df['Current Price'] = df['Current Price'].apply(lambda x: '{:,.12f}'.format(x).rstrip('0').rstrip('.'))
+    df[INFO_COLUMNS] = df[INFO_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    df[INFO_COLUMNS] = df[INFO_COLUMNS].fillna(0)
+    df[INFO_COLUMNS] = df[INFO_COLUMNS].map(abbreviate_number)
+    df[PERCENTAGE_COLUMNS] = df[PERCENTAGE_COLUMNS].map(lambda x: '{:,.2f}'.format(x))
+    df = df.sort_values('Rank')
+    return df.style.map(color_positive_negative, subset=PERCENTAGE_COLUMNS)
+
+def vectorized_transform(df):
+    return style_markets(transform_markets(df))
+
+def best_of(transform, df):
+    # Returns (format stage, format + colour stage) - Styler is lazy, _compute() runs the
+    # colour functions the way rendering would and includes pandas' own per-cell bookkeeping.
+    formatting, total = [], []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        styler = transform(df)
+        formatted = time.perf_counter()
+        styler._compute()
+        formatting.append(formatted - started)
+        total.append(time.perf_counter() - started)
+    return min(formatting), min(total)
+
+if __name__ == '__main__':
+    for rows in SIZES:
+        df = synthetic_markets(rows)
+        baseline = best_of(legacy_transform, df)
+        vectorized = best_of(vectorized_transform, df)
+        for stage, old, new in zip(('format', 'format + colours'), baseline, vectorized):
+            print(f"{rows:>6} rows {stage:<16} - element-wise: {old * 1000:8.2f} ms | vectorized: {new * 1000:8.2f} ms ({old / new:.1f}x)")
@@ -0,0 +1,66 @@
+"""
+Benchmark - BTC Market Cycles regime fill: two traces per regime (previous loop) vs two traces in total.
+
+Run from the repository root:
+    python -m benchmarks.bench_market_cycles_fill
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from extras.market_cycles import regime_fill_traces
+
+SIZES = (800, 3000, 10000)
+REPEATS = 5
+
+def synthetic_candles(rows, seed=0):
+    # Noisy random walk - the averages cross often, like a choppy market
+    rng = np.random.default_rng(seed)
+    close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.04, rows)))
+    df = pd.DataFrame({'close': close, 'open': close, 'high': close * 1.01, 'low': close * 0.99},
+                      index=pd.date_range('2017-08-17', periods=rows, freq='D'))
+    df['sma_50'] = df.close.rolling(window=20).mean()
+    df['sma_200'] = df.close.rolling(window=60).mean()
+    return df
+
+def base_figure(df):
+    return go.Figure(data=go.Ohlc(x=df.index, open=df.open, high=df.high, low=df.low, close=df.close, name='BTC'))
+
+# Previous implementation
+def legacy_figure(df):
+    df = df.copy()
+    fig = base_figure(df)
+    df['label'] = np.where(df['sma_50']>df['sma_200'], 1, 0)
+    df['group'] = df['label'].ne(df['label'].shift()).cumsum()
+    for _, data in df.groupby('group'):
+        fig.add_traces(go.Scatter(x=data.index, y = data.sma_50, name='',showlegend = False,hoverinfo='skip',
+                                line = dict(color='rgba(0,0,0,0)')))
+        fig.add_traces(go.Scatter(x=data.index, y = data.sma_200, name='',showlegend = False,hoverinfo='skip',
+                                line = dict(color='rgba(0,0,0,0)'),
+                                fill='tonexty',
+                                fillcolor = 'rgba(0,250,0,0.4)' if data['label'].iloc[0] >= 1 else 'rgba(250,0,0,0.4)'))
+    return fig
+
+def vectorized_figure(df):
+    fig = base_figure(df)
+    fig.add_traces(regime_fill_traces(df))
+    return fig
+
+def measure(build, df):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fig = build(df)
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(fig.data), len(fig.to_json())
+
+if __name__ == '__main__':
+    for rows in SIZES:
+        df = synthetic_candles(rows)
+        old_time, old_traces, old_size = measure(legacy_figure, df)
+        new_time, new_traces, new_size = measure(vectorized_figure, df)
+        print(f"{rows:>6} candles - loop: {old_time * 1000:8.1f} ms, {old_traces:4} traces, {old_size / 1024:7.0f} KiB"
+              f" | vectorized: {new_time * 1000:6.1f} ms, {new_traces} traces, {new_size / 1024:5.0f} KiB"
+              f" ({old_time / new_time:.0f}x faster)")
@@ -0,0 +1,110 @@
+"""
+Benchmark - Wallet Explorer aggregations: previous groupby / reindex / merge chains vs the single-pass kernel.
+
+Run from the repository root:
+    python -m benchmarks.bench_wallet_aggregation
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from extras import wallet_analytics
+
+TRANSACTIONS = 500_000
+COUNTERPARTIES = 20_000
+TOKENS = ['Dai Stablecoin', 'USD Coin', 'Tether USD', 'TrueUSD', 'Wrapped Ether', 'Chainlink', 'Uniswap', 'Shiba Inu']
+ADDRESS = '0x' + 'ab' * 20
+REPEATS = 3
+
+def synthetic_wallet(rows=TRANSACTIONS, seed=0):
+    # Half outgoing, half incoming transactions with a few thousand busy counterparties
+    rng = np.random.default_rng(seed)
+    peers = np.array([f"0x{i:040x}" for i in range(COUNTERPARTIES)], dtype=object)
+    counterparty = peers[rng.zipf(1.3, rows) % COUNTERPARTIES]
+    outgoing = rng.random(rows) < 0.5
+    return pd.DataFrame({
+        'hash': [f"0x{i:064x}" for i in range(rows)],
+        'from': np.where(outgoing, ADDRESS, counterparty),
+        'to': np.where(outgoing, counterparty, ADDRESS),
+        'value': rng.lognormal(3, 2, rows),
+        'gasPrice': rng.lognormal(3, 0.5, rows),
+        'tokenName': np.array(TOKENS, dtype=object)[rng.integers(0, len(TOKENS), rows)],
+    })
+
+def categorical_wallet(df):
+    # Same wallet typed like etherscan_store.frame - from / to over one shared address set, categorical tokens
+    codes, uniques = pd.factorize(pd.concat([df['from'], df['to']], ignore_index=True))
+    df = df.copy()
+    df['from'] = pd.Categorical.from_codes(codes[:len(df)], uniques)
+    df['to'] = pd.Categorical.from_codes(codes[len(df):], uniques)
+    df['tokenName'] = df['tokenName'].astype('category')
+    return df
+
+# Previous implementations (ETH path of group_transactions, holdings_erc20 before filters and total row)
+def legacy_counterparties(df, address):
+    outgoing_df = df[df['from'] == address].groupby('to').agg({'hash': 'count', 'value': 'sum', 'gasPrice': 'sum'}).reset_index()
+    incoming_df = df[df['to'] == address].groupby('from').agg({'hash': 'count', 'value': 'sum', 'gasPrice': 'sum'}).reset_index()
+    outgoing_df.columns = ['address', 'num_outgoing_transactions', 'total_value_outgoing_trxs','total_gas_paid_outgoing']
+    incoming_df.columns = ['address', 'num_incoming_transactions', 'total_value_incoming_trxs','total_gas_paid_incoming']
+    unique_addresses = pd.concat([df['from'], df['to']]).unique()
+    outgoing_df = outgoing_df.set_index('address').reindex(unique_addresses).reset_index().fillna(0)
+    incoming_df = incoming_df.set_index('address').reindex(unique_addresses).reset_index().fillna(0)
+    df_grouped = pd.merge(outgoing_df, incoming_df, how='outer', on='address')
+    df_grouped.columns = ['Address', '# Out Trx', 'ETH Out ','Gas Paid Out Trx', '# In Trx', 'ETH In','Gas Paid In Trx']
+    df_grouped = df_grouped.loc[~(df_grouped.iloc[:, 1:] == 0).all(axis=1)]
+    df_grouped = df_grouped.fillna(0).sort_values('ETH In', ascending=False)
+    df_grouped['# Out Trx'] = pd.to_numeric(df_grouped['# Out Trx'], downcast='integer', errors='coerce')
+    df_grouped['# In Trx'] = pd.to_numeric(df_grouped['# In Trx'], downcast='integer', errors='coerce')
+    return df_grouped
+
+def legacy_holdings(df, address):
+    df_out = df.loc[df['from'].isin([address])]
+    df_out = df_out.groupby(['tokenName']).agg(amount_out=('value', 'sum')).reset_index()
+    df_in = df.loc[df['to'].isin([address])]
+    df_in = df_in.groupby(['tokenName']).agg(amount_in=('value', 'sum')).reset_index()
+    df_holdings = pd.merge(df_in, df_out, on='tokenName', how='outer')
+    df_holdings.fillna(0, inplace=True)
+    df_holdings['current_holdings'] = df_holdings['amount_in'] - df_holdings['amount_out']
+    return df_holdings
+
+def kernel_counterparties(df, address):
+    return wallet_analytics.counterparties(df, address).sort_values('value_in', ascending=False, kind='stable')
+
+def measure(function, df):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = function(df, ADDRESS)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def same_totals(old, new):
+    # Totals compared by label - catches counterparties / tokens attached to the wrong row
+    old, new = old.groupby(level=0, observed=True).sum(), new.groupby(level=0, observed=True).sum()
+    old.index, new.index = old.index.astype(str), new.index.astype(str)
+    old, new = old.sort_index(), new.sort_index()
+    return old.index.equals(new.index) and np.allclose(old.to_numpy(), new.to_numpy())
+
+if __name__ == '__main__':
+    wallet = synthetic_wallet()
+    print(f"{len(wallet)} transactions, {wallet['from'].where(wallet['from'] != ADDRESS, wallet['to']).nunique()} counterparties")
+    # Object columns, the typed frame of the page, and the typed frame filtered to stablecoins like the ERC20 table
+    categorical = categorical_wallet(wallet)
+    inputs = {'object': wallet, 'categorical': categorical,
+              'categorical, stablecoins': categorical[categorical['tokenName'].isin(TOKENS[:4])]}
+
+    for name, df in inputs.items():
+        legacy_df = df.astype({'from': object, 'to': object, 'tokenName': object})
+        old_time, old = measure(legacy_counterparties, legacy_df)
+        new_time, new = measure(kernel_counterparties, df)
+        matches = same_totals(old.set_index('Address')[['ETH In', 'ETH Out ']], new.set_index('counterparty')[['value_in', 'value_out']])
+        print(f"{name:>24} per counterparty - merge chain: {old_time * 1000:7.1f} ms, {old.memory_usage(deep=True).sum() / 2**20:5.1f} MiB"
+              f" | kernel: {new_time * 1000:6.1f} ms, {new.memory_usage(deep=True).sum() / 2**20:5.1f} MiB"
+              f" ({old_time / new_time:.1f}x faster, same totals: {matches})")
+
+        old_time, old = measure(legacy_holdings, legacy_df)
+        new_time, new = measure(wallet_analytics.holdings, df)
+        matches = same_totals(old.set_index('tokenName')[['amount_in', 'amount_out']], new.set_index('tokenName')[['amount_in', 'amount_out']])
+        print(f"{name:>24} per token        - merge chain: {old_time * 1000:7.1f} ms | kernel: {new_time * 1000:6.1f} ms"
+              f" ({old_time / new_time:.1f}x faster, same totals: {matches})")
@@ -2,18 +2,42 @@
 import pandas as pd
 import logging
 from binance.client import Client
-import sqlite3
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-def connect_to_binance():
+from extras import kline_store, indicators, columnar_store, cross_asset, http_client
+
+# Concurrency settings - the request weight budget is the api.binance.com bucket of extras/http_client.py
+MAX_WORKERS = 8
+KLINES_WEIGHT = 2
+EXCHANGE_INFO_WEIGHT = 20
+KLINES_LIMIT = 1000
+START_DATE = '01-01-2017'
+
+# Intervals ingested for every pair (any key of kline_store.INTERVAL_MS) and where a cold backfill starts.
+# Minute candles grow ~1440x faster than daily ones - keep their history window short.
+INTERVALS = ("1d",)
+BACKFILL_START = {
+    "1m": '01-01-2024',
+    "5m": '01-01-2023',
+    "1h": START_DATE,
+    "4h": START_DATE,
+    "1d": START_DATE,
+}
+# Chunks waiting for the writer - bounds memory when the network outruns SQLite
+QUEUE_SIZE = 64
+
 
-    # Get the absolute path to the directory of the current file.
-    dir_path = Path(__file__).parent.resolve()
-    db_path = dir_path / '..' / 'dbs' / 'trading_data.db'
+def connect_to_binance():
 
-    # Binance Client
+    # Binance Client - one per worker thread, all sharing the same weight budget
     client = Client()
+    clients = threading.local()
+    limiter = http_client.limiter("api.binance.com")
 
     # Logger
     logger = logging.getLogger(__name__)
@@ -35,8 +59,13 @@ def connect_to_binance():
     logger.addHandler(handler)
 
     # Functions
+    def get_client():
+        if not hasattr(clients, 'client'):
+            clients.client = Client()
+        return clients.client
+
     def convert_to_float(data):
-        # Convert formats to floats 
+        # Convert formats to floats
         columns = ["open", "high", "low", "close", "volume", "num_trades"]
         for col in columns:
             data[col] = data[col].astype(float)
@@ -45,73 +74,145 @@ def connect_to_binance():
     def get_trading_pairs():
         # Screen available pairs - Using USDT pairs.
         try:
+            limiter.acquire(EXCHANGE_INFO_WEIGHT)
             info = client.get_exchange_info()
-            return [symbol["symbol"] for symbol in info["symbols"] 
-            if symbol["status"] == "TRADING" 
-            and "USDT" in symbol["symbol"] 
-            and "UPUSDT" not in symbol["symbol"] 
+            return [symbol["symbol"] for symbol in info["symbols"]
+            if symbol["status"] == "TRADING"
+            and "USDT" in symbol["symbol"]
+            and "UPUSDT" not in symbol["symbol"]
             and "DOWNUSDT" not in symbol["symbol"]]
         except Exception as e:
             logger.error(f"Error retrieving trading pairs: {e}")
             return []
 
-    def get_historical_data(symbol, start_date, end_date=None, interval="1d", limit=1000):
-        klines = client.get_historical_klines(symbol, interval, start_str=start_date, end_str=end_date, limit=limit)
+    def to_frame(klines):
         data = pd.DataFrame(klines, columns=["open_time", "open", "high", "low", "close", "volume", "close_time", "quote_volume", "num_trades", "taker_buy_base_volume", "taker_buy_quote_volume", "ignore"])
         data = data.drop(["quote_volume","taker_buy_base_volume", "taker_buy_quote_volume", "ignore"], axis=1)
         data = convert_to_float(data)
-        data["open_time"] = pd.to_datetime(data["open_time"], unit='ms')
-        data["close_time"] = pd.to_datetime(data["close_time"], unit='ms')
+        data["num_trades"] = data["num_trades"].astype(int)
         return data
 
-    def create_table(c, pair):
-        # Create a table for each pair - Adding prefix to avoid issue with token/coin starting with integers
-        table_name = "pair_" + pair
-        c.execute(f'''CREATE TABLE IF NOT EXISTS {table_name} (
-            open_time TIMESTAMP,
-            open REAL,
-            high REAL,
-            low REAL,
-            close REAL,
-            volume REAL,
-            close_time TIMESTAMP,
-            num_trades INTEGER
-        )''')
+    def fetch_pair(pair, interval, start_ms, chunks, started, stopped):
+        # Runs on a worker thread - network only, each chunk of closed candles is handed to the writer.
+        # Paging the klines endpoint here charges every request to the shared budget.
+        # The pair is timed from here (not from scheduling), a pair in `stopped` fetches no further.
+        started[(pair, interval)] = time.monotonic()
+        try:
+            current_time_utc = kline_store.to_ms(datetime.utcnow())
+            while (pair, interval) not in stopped:
+                limiter.acquire(KLINES_WEIGHT)
+                batch = get_client().get_klines(symbol=pair, interval=interval, startTime=start_ms, limit=KLINES_LIMIT)
+                data = to_frame(batch)
+                # Drop the unclosed candlestick, it is fetched again once closed
+                closed = data[data["close_time"] <= current_time_utc]
+                if not closed.empty:
+                    chunks.put((pair, interval, closed, None))
+                if len(batch) < KLINES_LIMIT or len(closed) < len(data):
+                    break
+                start_ms = batch[-1][0] + 1
+            chunks.put((pair, interval, None, None))
+        except Exception as e:
+            chunks.put((pair, interval, None, e))
+
+    def finish_pair(conn, pair, interval, first_open_time):
+        # Extend the stored indicators with the new candles (also catches up migrated pairs)
+        with conn:
+            indicators.update_indicators(conn, pair, interval)
+        # Columnar copy - rewrite the files touched by the new rows, everything on first export
+        try:
+            if not columnar_store.has_symbol(pair, interval):
+                columnar_store.export_symbol(conn, pair, interval)
+            elif first_open_time is not None:
+                columnar_store.export_symbol(conn, pair, interval, since=first_open_time)
+        except Exception as e:
+            logger.error(f"Error exporting {pair} {interval} to Parquet: {e}")
 
     trading_pairs = get_trading_pairs()
 
     # Update the main part of the script
     if trading_pairs:
-        with sqlite3.connect(str(db_path)) as conn:
-            c = conn.cursor()
-            for pair in trading_pairs:
-                create_table(c, pair)
+        job_started = time.monotonic()
+        total_rows = 0
+        failed = 0
+
+        # The main thread is the single writer and owns the SQLite connection.
+        with kline_store.connect() as conn:
+            kline_store.migrate_pair_tables(conn, logger)
+
+            # Resume every pair / interval from its checkpoint (ms precision), cold pairs from BACKFILL_START
+            jobs = {}
+            with conn:
+                for interval in INTERVALS:
+                    for pair in trading_pairs:
+                        next_open_time = kline_store.get_checkpoint(conn, pair, interval)
+                        if next_open_time is None:
+                            next_open_time = kline_store.to_ms(BACKFILL_START[interval])
+                        else:
+                            kline_store.set_checkpoint(conn, pair, interval, next_open_time)
+                        jobs[(pair, interval)] = next_open_time
+
+            chunks = queue.Queue(maxsize=QUEUE_SIZE)
+            rows_added = {job: 0 for job in jobs}
+            first_open_time = {}
+            started = {}
+            # Pairs whose chunk failed to write - their later chunks are dropped
+            write_errors = {}
+            done = 0
+
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for (pair, interval), next_open_time in jobs.items():
+                    executor.submit(fetch_pair, pair, interval, next_open_time, chunks, started, write_errors)
+
+                while done < len(jobs):
+                    pair, interval, data, error = chunks.get()
+                    job = (pair, interval)
+
+                    # A chunk - candles and checkpoint are committed together. After a failed write the
+                    # checkpoint must not move past the lost rows: the rest of the pair is dropped and
+                    # fetched again from the last good checkpoint next run.
+                    if data is not None:
+                        if job in write_errors:
+                            continue
+                        try:
+                            rows_added[job] += kline_store.write_chunk(conn, pair, interval, data)
+                            first_open_time.setdefault(job, int(data["open_time"].min()))
+                        except Exception as e:
+                            write_errors[job] = e
+                        continue
+
+                    # End of a pair - whatever was written before an error is kept and resumed next run
+                    done += 1
+                    progress = f"[{done}/{len(jobs)}]"
+                    if job in write_errors:
+                        error = write_errors[job]
+                        failed += 1
+                        logger.error(f"{progress} Error writing data for {pair} {interval}: {error} - Rows kept: {rows_added[job]}")
+                    elif error is not None:
+                        failed += 1
+                        logger.error(f"{progress} Error retrieving data for {pair} {interval}: {error} - Rows kept: {rows_added[job]}")
+                    try:
+                        finish_pair(conn, pair, interval, first_open_time.get(job))
+                    except Exception as e:
+                        logger.error(f"{progress} Error updating indicators for {pair} {interval}: {e}")
+                    if error is None:
+                        elapsed = time.monotonic() - started[job]
+                        if rows_added[job]:
+                            logger.info(f"{progress} Adding trading pair: {pair} {interval} - Rows added: {rows_added[job]} - Done in {elapsed:.2f}s")
+                        else:
+                            logger.info(f"{progress} Adding trading pair: {pair} {interval} - No new rows added")
+                    total_rows += rows_added[job]
+
+            # Correlation / beta / volatility of all pairs over the refreshed daily closes
+            if "1d" in INTERVALS:
                 try:
-                    table_name = "pair_" + pair
-                    c.execute(f"SELECT MAX(open_time) FROM {table_name}")
-                    latest_timestamp = c.fetchone()[0]
-                    if latest_timestamp:
-                        latest_timestamp = pd.to_datetime(latest_timestamp)
-                        start_date = latest_timestamp.strftime("%m-%d-%Y")
-                    else:
-                        start_date = '01-01-2017'
-                    
-                    data = get_historical_data(pair, start_date)
-                    
-                    # Check if the last row has an unclosed candlestick and drop it if necessary
-                    current_time_utc = datetime.utcnow()
-                    if not data.empty and data.iloc[-1]["close_time"] > current_time_utc:
-                        data = data.iloc[:-1]
-
-                    
-                    if not data.empty:
-                        # Exclude rows with the same timestamp as the latest timestamp in the database
-                        data = data[data['open_time'] != latest_timestamp]
-
-                        data.to_sql(table_name, conn, if_exists='append', index=False)
-                        rows_added = len(data)
-                        logger.info(f"Adding trading pair: {pair} - Rows added: {rows_added}")
-                    else:
-                        logger.info(f"Adding trading pair: {pair} - No new rows added")
+                    analytics_started = time.monotonic()
+                    pairs = cross_asset.update(conn, "1d")
+                    logger.info(f"Cross-asset analytics updated for {pairs} pairs in {time.monotonic() - analytics_started:.1f}s")
                 except Exception as e:
-                    logger.error(f"Error retrieving data for {pair}: {e}")
\ No newline at end of file
+                    logger.error(f"Error updating cross-asset analytics: {e}")
+
+        # Throughput report
+        elapsed = time.monotonic() - job_started
+        logger.info(f"Throughput: {len(jobs)} pairs/intervals ({failed} failed), {total_rows} rows in {elapsed:.1f}s - "
+                    f"{len(jobs) / elapsed:.2f} pairs/s, {total_rows / elapsed:.1f} rows/s, "
+                    f"request weight used: {limiter.used}")
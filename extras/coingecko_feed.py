@@ -1,54 +1,90 @@
 import sqlite3
 import requests
+import pandas as pd
+from datetime import datetime, timezone
 from pathlib import Path
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def connect_to_coingecko():
-    # Logger setup
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
+from extras import http_client
 
-    parent_dir = Path(__file__).parent.parent.resolve()
-    log_dir = parent_dir / 'logs'
-    log_dir.mkdir(exist_ok=True)
+# Columns of the 'markets' table, in the order of the CoinGecko /coins/markets payload.
+MARKET_COLUMNS = [
+    'id',
+    'symbol',
+    'name',
+    'image',
+    'current_price',
+    'market_cap',
+    'market_cap_rank',
+    'fully_diluted_valuation',
+    'total_volume',
+    'high_24h',
+    'low_24h',
+    'price_change_24h',
+    'price_change_percentage_24h',
+    'market_cap_change_24h',
+    'market_cap_change_percentage_24h',
+    'circulating_supply',
+    'total_supply',
+    'max_supply',
+    'ath',
+    'ath_change_percentage',
+    'ath_date',
+    'atl',
+    'atl_change_percentage',
+    'atl_date',
+    'last_updated',
+    'price_change_percentage_14d_in_currency',
+    'price_change_percentage_1h_in_currency',
+    'price_change_percentage_1y_in_currency',
+    'price_change_percentage_200d_in_currency',
+    'price_change_percentage_24h_in_currency',
+    'price_change_percentage_30d_in_currency',
+    'price_change_percentage_7d_in_currency',
+]
 
-    log_file = log_dir / 'coingecko_feed.log'
-    handler = logging.FileHandler(log_file, mode='w')  # 'w' means overwrite the file each time.
+INSERT_MARKETS = f"""
+    INSERT OR REPLACE INTO markets ({', '.join(MARKET_COLUMNS)})
+    VALUES ({', '.join('?' * len(MARKET_COLUMNS))})
+"""
 
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+# Markets pages of 250 coins fetched per refresh (4 = top 1000), concurrently within the API budget.
+# The public API allows about 10 calls per minute - raise CALLS_PER_MINUTE with a paid plan.
+PAGES = 4
+CALLS_PER_MINUTE = 10
+MAX_WORKERS = 8
 
-    COINGECKO_API_URL = "https://api.coingecko.com/api/v3/coins/markets"
-    PARAMS = {
-        "vs_currency": "usd",
-        "order": "market_cap_desc",
-        "per_page": 250,
-        "page": 4,
-        "sparkline": "false",
-        "price_change_percentage": "1h,24h,7d,14d,30d,200d,1y",
-        "locale": "en",
-    }
+# History keeps only the fields that move between refreshes - 'markets' remains the latest snapshot.
+SNAPSHOT_COLUMNS = [
+    'current_price',
+    'market_cap',
+    'market_cap_rank',
+    'total_volume',
+    'circulating_supply',
+    'price_change_percentage_24h',
+]
+SNAPSHOT_RETENTION_DAYS = 30
 
-    dir_path = Path(__file__).parent.resolve()
-    db_path = dir_path / '..' / 'dbs' / 'coingecko.db'
+INSERT_SNAPSHOTS = f"""
+    INSERT OR REPLACE INTO market_snapshots (id, snapshot_ts, {', '.join(SNAPSHOT_COLUMNS)})
+    VALUES (?, ?, {', '.join('?' * len(SNAPSHOT_COLUMNS))})
+"""
 
-    def fetch_data(url, params, page):
-        params['page'] = page
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"An error occurred while fetching data: {e}")
-            return None
+# Daily close history per coin (BTC Market Cycles) with its long moving averages, extended incrementally.
+MARKET_CHART_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+HISTORY_COINS = ("bitcoin",)
+# Moving average windows in days - 50 and 200 weeks
+HISTORY_SMA_WINDOWS = (350, 1400)
+HISTORY_SMA_COLUMNS = [f"sma_{window}d" for window in HISTORY_SMA_WINDOWS]
 
-    # Create a connection to SQLite database
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+INSERT_PRICE_HISTORY = f"""
+    INSERT OR REPLACE INTO price_history (coin_id, date, price, {', '.join(HISTORY_SMA_COLUMNS)})
+    VALUES (?, ?, ?, {', '.join('?' * len(HISTORY_SMA_COLUMNS))})
+"""
 
+def create_markets_table(cursor):
     # Create a new table named 'markets'
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS markets
@@ -89,96 +125,205 @@ def connect_to_coingecko():
         )
     """)
 
-    for page in range(1, 5):
-        data = fetch_data(COINGECKO_API_URL, PARAMS, page)
-
-        if data is not None:
-            for item in data:
-                # Insert data into 'markets' table
-                values = (
-                    item['id'],
-                    item['symbol'],
-                    item['name'],
-                    item['image'],
-                    item['current_price'],
-                    item['market_cap'],
-                    item['market_cap_rank'],
-                    item['fully_diluted_valuation'],
-                    item['total_volume'],
-                    item['high_24h'],
-                    item['low_24h'],
-                    item['price_change_24h'],
-                    item['price_change_percentage_24h'],
-                    item['market_cap_change_24h'],
-                    item['market_cap_change_percentage_24h'],
-                    item['circulating_supply'],
-                    item['total_supply'],
-                    item['max_supply'],
-                    item['ath'],
-                    item['ath_change_percentage'],
-                    item['ath_date'],
-                    item['atl'],
-                    item['atl_change_percentage'],
-                    item['atl_date'],
-                    item['last_updated'],
-                    item['price_change_percentage_14d_in_currency'],
-                    item['price_change_percentage_1h_in_currency'],
-                    item['price_change_percentage_1y_in_currency'],
-                    item['price_change_percentage_200d_in_currency'],
-                    item['price_change_percentage_24h_in_currency'],
-                    item['price_change_percentage_30d_in_currency'],
-                    item['price_change_percentage_7d_in_currency']
-                )
-
-                try:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO markets
-                        (
-                            id,
-                            symbol,
-                            name,
-                            image,
-                            current_price,
-                            market_cap,
-                            market_cap_rank,
-                            fully_diluted_valuation,
-                            total_volume,
-                            high_24h,
-                            low_24h,
-                            price_change_24h,
-                            price_change_percentage_24h,
-                            market_cap_change_24h,
-                            market_cap_change_percentage_24h,
-                            circulating_supply,
-                            total_supply,
-                            max_supply,
-                            ath,
-                            ath_change_percentage,
-                            ath_date,
-                            atl,
-                            atl_change_percentage,
-                            atl_date,
-                            last_updated,
-                            price_change_percentage_14d_in_currency,
-                            price_change_percentage_1h_in_currency,
-                            price_change_percentage_1y_in_currency,
-                            price_change_percentage_200d_in_currency,
-                            price_change_percentage_24h_in_currency,
-                            price_change_percentage_30d_in_currency,
-                            price_change_percentage_7d_in_currency
-                        ) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,?, ?, ?, ?, ?, ?, ?)
-                    """, values)
-                    logger.info(f"Data inserted successfully for {item['id']}")
-                except Exception as e:
-                    logger.error(f"An error occurred while inserting data: {e}")
-
-            # Commit the transaction
-            conn.commit()
-        else:
-            logger.warning("No data fetched to insert into the database")
-
-        time.sleep(10)
+def create_snapshot_table(cursor):
+    # Append-only history, one row per coin and refresh (snapshot_ts in epoch seconds)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS market_snapshots
+        (
+            id TEXT NOT NULL,
+            snapshot_ts INTEGER NOT NULL,
+            current_price REAL,
+            market_cap INTEGER,
+            market_cap_rank INTEGER,
+            total_volume INTEGER,
+            circulating_supply INTEGER,
+            price_change_percentage_24h REAL,
+            PRIMARY KEY (id, snapshot_ts)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_snapshots_ts ON market_snapshots (snapshot_ts)")
+
+def create_price_history_table(cursor):
+    # One row per coin and closed UTC day (date as YYYY-MM-DD)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS price_history
+        (
+            coin_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            price REAL,
+            {' REAL, '.join(HISTORY_SMA_COLUMNS)} REAL,
+            PRIMARY KEY (coin_id, date)
+        ) WITHOUT ROWID
+    """)
+
+def market_rows(data):
+    # Build one tuple per coin, missing keys are stored as NULL
+    return [tuple(item.get(column) for column in MARKET_COLUMNS) for item in data]
+
+def snapshot_rows(rows, snapshot_ts):
+    positions = [MARKET_COLUMNS.index(column) for column in SNAPSHOT_COLUMNS]
+    return [(row[0], snapshot_ts, *[row[i] for i in positions]) for row in rows]
+
+def write_markets(conn, rows, snapshot_ts=None, replace=False):
+    # Single executemany inside one transaction - rolled back as a whole on error.
+    # replace=True swaps the whole table, coins that left the ranking are dropped with the old snapshot.
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM markets")
+        conn.executemany(INSERT_MARKETS, rows)
+        if snapshot_ts is not None:
+            conn.executemany(INSERT_SNAPSHOTS, snapshot_rows(rows, snapshot_ts))
+    return len(rows)
+
+def prune_snapshots(conn, now, retention_days=SNAPSHOT_RETENTION_DAYS):
+    # Rolling retention - drop every snapshot older than the window
+    with conn:
+        cursor = conn.execute("DELETE FROM market_snapshots WHERE snapshot_ts < ?", (now - retention_days * 86400,))
+    return cursor.rowcount
+
+def last_history_date(conn, coin_id):
+    row = conn.execute("SELECT date FROM price_history WHERE coin_id = ? ORDER BY date DESC LIMIT 1", (coin_id,)).fetchone()
+    return row[0] if row else None
+
+def history_rows(conn, coin_id, prices, today):
+    """
+    Rows for the closed days of a market_chart 'prices' payload that are not stored yet.
+    The moving averages only need the last max(HISTORY_SMA_WINDOWS) stored prices, never the full history.
+    """
+    df = pd.DataFrame(prices, columns=['time', 'price'])
+    df['date'] = pd.to_datetime(df['time'], unit='ms').dt.strftime('%Y-%m-%d')
+    # Today's point is the live price - only closed days are stored, one price per day
+    df = df[df['date'] < today].drop_duplicates('date', keep='last')
+    last_date = last_history_date(conn, coin_id)
+    if last_date is not None:
+        df = df[df['date'] > last_date]
+    if df.empty:
+        return []
+
+    stored = pd.read_sql_query("""SELECT date, price FROM price_history WHERE coin_id = ?
+                                  ORDER BY date DESC LIMIT ?""", conn, params=(coin_id, max(HISTORY_SMA_WINDOWS) - 1))
+    history = pd.concat([stored.iloc[::-1], df[['date', 'price']]], ignore_index=True)
+    for window, column in zip(HISTORY_SMA_WINDOWS, HISTORY_SMA_COLUMNS):
+        history[column] = history['price'].rolling(window=window).mean()
+    # NaN (averages not defined yet) is stored as NULL by SQLite
+    new_days = history.iloc[len(stored):][['date', 'price'] + HISTORY_SMA_COLUMNS]
+    return [(coin_id, *row) for row in new_days.itertuples(index=False, name=None)]
+
+def update_price_history(conn, coin_id, logger):
+    """
+    Append the days missing from price_history - the first run downloads the full history (days=max),
+    later runs only the days since the last stored one, and nothing at all once yesterday is stored.
+    """
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    last_date = last_history_date(conn, coin_id)
+    if last_date is None:
+        days = 'max'
+    else:
+        days = (pd.Timestamp(today) - pd.Timestamp(last_date)).days
+        if days <= 1:
+            return 0
+    response = http_client.get(MARKET_CHART_URL.format(coin_id=coin_id),
+                               params={"vs_currency": "usd", "days": days, "interval": "daily"})
+    response.raise_for_status()
+    rows = history_rows(conn, coin_id, response.json()['prices'], today)
+    with conn:
+        conn.executemany(INSERT_PRICE_HISTORY, rows)
+    logger.info(f"Price history {coin_id}: {len(rows)} days added")
+    return len(rows)
+
+def connect_to_coingecko(pages=PAGES, calls_per_minute=CALLS_PER_MINUTE):
+    # Logger setup
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.INFO)
+
+    parent_dir = Path(__file__).parent.parent.resolve()
+    log_dir = parent_dir / 'logs'
+    log_dir.mkdir(exist_ok=True)
+
+    log_file = log_dir / 'coingecko_feed.log'
+    handler = logging.FileHandler(log_file, mode='w')  # 'w' means overwrite the file each time.
+
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+    COINGECKO_API_URL = "https://api.coingecko.com/api/v3/coins/markets"
+    PARAMS = {
+        "vs_currency": "usd",
+        "order": "market_cap_desc",
+        "per_page": 250,
+        "page": 4,
+        "sparkline": "false",
+        "price_change_percentage": "1h,24h,7d,14d,30d,200d,1y",
+        "locale": "en",
+    }
+
+    dir_path = Path(__file__).parent.resolve()
+    db_path = dir_path / '..' / 'dbs' / 'coingecko.db'
+
+    def fetch_data(url, params, page):
+        try:
+            response = http_client.get(url, params={**params, 'page': page})
+            response.raise_for_status()
+            data = response.json()
+            return data
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred while fetching page {page}: {e}")
+            return None
+
+    def timed_fetch(page):
+        # Each page is timed from its own start - a long time points at retries / waits on the budget
+        page_started = time.monotonic()
+        return fetch_data(COINGECKO_API_URL, PARAMS, page), time.monotonic() - page_started
+
+    http_client.set_limit("api.coingecko.com", calls_per_minute)
+
+    # Create a connection to SQLite database
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")  # readers (live prices page) never block the refresh
+    cursor = conn.cursor()
+    create_markets_table(cursor)
+    create_snapshot_table(cursor)
+    create_price_history_table(cursor)
+
+    # Every page of this refresh shares the same snapshot timestamp
+    snapshot_ts = int(time.time())
+
+    # Pages are fetched concurrently - the api.coingecko.com bucket paces them
+    started = time.monotonic()
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(pages, MAX_WORKERS)) as executor:
+        futures = {executor.submit(timed_fetch, page): page for page in range(1, pages + 1)}
+        # Outcome of every page as it completes
+        for future in as_completed(futures):
+            page = futures[future]
+            data, elapsed = future.result()
+            results[page] = data
+            if data is not None:
+                logger.info(f"Page {page}: {len(data)} rows fetched in {elapsed:.1f}s")
+            else:
+                logger.warning(f"Page {page}: no data after {elapsed:.1f}s")
+
+    # All pages or nothing - a failed page keeps the previous snapshot whole
+    failed = sorted(page for page, data in results.items() if data is None)
+    if failed:
+        logger.warning(f"Pages {failed} could not be fetched - markets left unchanged")
+    else:
+        try:
+            rows = [row for page in sorted(results) for row in market_rows(results[page])]
+            rows_written = write_markets(conn, rows, snapshot_ts, replace=True)
+            logger.info(f"{pages} pages: {rows_written} rows inserted successfully in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"An error occurred while inserting the markets: {e}")
+
+    for coin_id in HISTORY_COINS:
+        try:
+            update_price_history(conn, coin_id, logger)
+        except Exception as e:
+            logger.error(f"An error occurred while updating the price history of {coin_id}: {e}")
+
+    rows_pruned = prune_snapshots(conn, snapshot_ts)
+    logger.info(f"Snapshot {snapshot_ts} stored - {rows_pruned} rows older than {SNAPSHOT_RETENTION_DAYS} days pruned")
 
     # Close the connection
     conn.close()
\ No newline at end of file
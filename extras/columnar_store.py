@@ -0,0 +1,117 @@
+# Libraries
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from pathlib import Path
+
+from extras import kline_store
+from extras.indicators import INDICATOR_COLUMNS
+
+# Columnar copy of trading_data.db written by the Binance feed:
+#   dbs/parquet/interval=<interval>/symbol=<SYMBOL>/year=<YYYY>.parquet
+# Minute intervals are split per month instead (month=<YYYY-MM>.parquet), so an incremental
+# export rewrites one small file rather than a whole year of candles.
+dir_path = Path(__file__).parent.resolve()
+parquet_path = dir_path / '..' / 'dbs' / 'parquet'
+MONTHLY_INTERVALS = ("1m", "5m")
+
+# Written once a full export has succeeded - a folder without it (export failed partway) is not served
+# and is exported again in full by the next feed run
+COMPLETE_MARKER = "_SUCCESS"
+
+# Row groups carry min/max statistics - date filters skip the groups outside the range
+ROW_GROUP_SIZE = 50_000
+
+SCHEMA = pa.schema(
+    [("open_time", pa.timestamp("ms")),
+     ("open", pa.float64()),
+     ("high", pa.float64()),
+     ("low", pa.float64()),
+     ("close", pa.float64()),
+     ("volume", pa.float64()),
+     ("close_time", pa.timestamp("ms")),
+     ("num_trades", pa.int64())]
+    + [(column, pa.float64()) for column in INDICATOR_COLUMNS]
+)
+
+def symbol_path(symbol, interval="1d", root=parquet_path):
+    return Path(root) / f"interval={interval}" / f"symbol={symbol}"
+
+def has_symbol(symbol, interval="1d", root=parquet_path):
+    return (symbol_path(symbol, interval, root) / COMPLETE_MARKER).is_file()
+
+def partition_keys(interval, open_times):
+    # File stem of each candle - year=YYYY or month=YYYY-MM
+    if interval in MONTHLY_INTERVALS:
+        return "month=" + open_times.dt.strftime("%Y-%m")
+    return "year=" + open_times.dt.year.astype(str)
+
+def partition_bounds(stem):
+    # [start, end) covered by a file stem
+    kind, value = stem.split("=")
+    start = pd.Timestamp(f"{value}-01" if kind == "month" else f"{value}-01-01")
+    return start, start + (pd.DateOffset(months=1) if kind == "month" else pd.DateOffset(years=1))
+
+def partition_start(interval, open_time):
+    # First candle of the file holding open_time
+    start = pd.to_datetime(open_time, unit='ms')
+    if interval in MONTHLY_INTERVALS:
+        return start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return pd.Timestamp(year=start.year, month=1, day=1)
+
+def export_symbol(conn, symbol, interval="1d", since=None, root=parquet_path):
+    """
+    Rewrite the Parquet files of a pair from SQLite, starting with the file holding `since` (ms).
+    since=None exports the full history. Files are replaced atomically, readers never see a partial file,
+    and the pair is only served from Parquet (has_symbol) once a full export has completed.
+    """
+    folder = symbol_path(symbol, interval, root)
+    full = since is None or not has_symbol(symbol, interval, root)
+    start = None if full else partition_start(interval, since)
+    data = kline_store.read_klines(conn, symbol, interval, start=start, with_indicators=True)
+    if data.empty:
+        return 0
+
+    folder.mkdir(parents=True, exist_ok=True)
+    marker = folder / COMPLETE_MARKER
+    if full:
+        marker.unlink(missing_ok=True)
+
+    keys = partition_keys(interval, data["open_time"])
+    for key, frame in data.groupby(keys):
+        table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+        target = folder / f"{key}.parquet"
+        tmp_target = folder / f".{key}.parquet.tmp"
+        pq.write_table(table, tmp_target, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+        os.replace(tmp_target, target)
+    if full:
+        marker.touch()
+    return keys.nunique()
+
+def read_klines(symbol, interval="1d", start=None, end=None, root=parquet_path):
+    """
+    Same result as kline_store.read_klines(..., with_indicators=True), served from memory-mapped Parquet.
+    Only the files overlapping the range are opened, and the date predicate is pushed down to row groups.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    files = []
+    for path in sorted(symbol_path(symbol, interval, root).glob("*=*.parquet")):
+        file_start, file_end = partition_bounds(path.stem)
+        if (start is None or file_end > start) and (end is None or file_start <= end):
+            files.append(str(path))
+    if not files:
+        return SCHEMA.empty_table().to_pandas()
+
+    predicate = None
+    if start is not None:
+        predicate = ds.field("open_time") >= pa.scalar(start.to_pydatetime(), type=pa.timestamp("ms"))
+    if end is not None:
+        upper = ds.field("open_time") <= pa.scalar(end.to_pydatetime(), type=pa.timestamp("ms"))
+        predicate = upper if predicate is None else predicate & upper
+
+    dataset = ds.dataset(files, schema=SCHEMA, format="parquet", filesystem=pafs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(filter=predicate).to_pandas().sort_values("open_time", ignore_index=True)
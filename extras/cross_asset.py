@@ -0,0 +1,166 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from extras import kline_store
+
+# Cross-asset statistics over every stored pair, refreshed by the Binance feed after ingestion and
+# read by the Cross Asset Analytics page. All pairs are aligned in one (periods x pairs) close matrix,
+# statistics are computed with matrix products and cumulative sums - no loop over pairs.
+BENCHMARK = "BTCUSDT"
+CORRELATION_WINDOW = 90
+VOLATILITY_WINDOW = 30
+# Days of rolling beta / volatility kept per pair
+HISTORY_PERIODS = 365
+# Pairs with fewer overlapping returns in a window get no statistic
+MIN_OBSERVATIONS = 30
+
+def create_tables(conn):
+    # Pairwise correlation of log returns over the latest CORRELATION_WINDOW, both (a, b) and (b, a) are stored
+    conn.execute('''CREATE TABLE IF NOT EXISTS asset_correlations (
+        interval TEXT NOT NULL,
+        symbol_a TEXT NOT NULL,
+        symbol_b TEXT NOT NULL,
+        correlation REAL NOT NULL,
+        observations INTEGER NOT NULL,
+        PRIMARY KEY (interval, symbol_a, symbol_b)
+    ) WITHOUT ROWID''')
+    # Rolling beta / correlation against BENCHMARK and annualised volatility, one row per pair and candle
+    conn.execute('''CREATE TABLE IF NOT EXISTS asset_stats (
+        interval TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        open_time INTEGER NOT NULL,
+        beta REAL,
+        correlation REAL,
+        volatility REAL,
+        PRIMARY KEY (interval, symbol, open_time)
+    ) WITHOUT ROWID''')
+    conn.commit()
+
+def close_matrix(conn, interval="1d", periods=HISTORY_PERIODS + CORRELATION_WINDOW + 1):
+    """
+    Closes of every stored pair over the last `periods` candles of BENCHMARK.
+    Returns (open_times, symbols, closes) - closes is a (periods x pairs) array, NaN where a pair has no candle.
+    """
+    latest = kline_store.latest_open_time(conn, BENCHMARK, interval)
+    if latest is None:
+        return np.array([], dtype=np.int64), [], np.empty((0, 0))
+    open_times, symbols, values = kline_store.matrices(conn, interval, latest, periods, ("close",))
+    return open_times, symbols, values["close"]
+
+def log_returns(closes):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(closes), axis=0)
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+def correlation_matrix(returns, min_observations=MIN_OBSERVATIONS):
+    """
+    Pairwise-complete correlation of every column pair, as (correlations, observations).
+    Each pair uses only the rows where both columns have a value - all sums are matrix products.
+    """
+    present = (~np.isnan(returns)).astype(float)
+    values = np.nan_to_num(returns)
+    n = present.T @ present
+    # sums[i, j]: sum of column i over the rows shared with column j
+    sums = values.T @ present
+    squares = (values * values).T @ present
+    products = values.T @ values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = n * products - sums * sums.T
+        variance = n * squares - sums * sums
+        correlations = covariance / np.sqrt(variance * variance.T)
+    correlations[n < min_observations] = np.nan
+    return np.clip(correlations, -1, 1), n.astype(int)
+
+def rolling_sums(values, window):
+    # Sum of each trailing window along the time axis, for every column at once
+    totals = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+    return totals[window:] - totals[:-window]
+
+def rolling_stats(returns, benchmark, periods_per_year):
+    """
+    Rolling beta and correlation against the benchmark column (CORRELATION_WINDOW) and annualised
+    volatility (VOLATILITY_WINDOW) of every column. Arrays are aligned on the last rows of returns.
+    """
+    shared = ~np.isnan(returns) & ~np.isnan(benchmark)[:, None]
+    x = np.where(shared, returns, 0.0)
+    b = np.where(shared, benchmark[:, None], 0.0)
+    n, sx, sb = (rolling_sums(v, CORRELATION_WINDOW) for v in (shared.astype(float), x, b))
+    sxb, sxx, sbb = (rolling_sums(v, CORRELATION_WINDOW) for v in (x * b, x * x, b * b))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = n * sxb - sx * sb
+        beta = covariance / (n * sbb - sb * sb)
+        correlation = covariance / np.sqrt((n * sxx - sx * sx) * (n * sbb - sb * sb))
+    beta[n < MIN_OBSERVATIONS] = np.nan
+    correlation[n < MIN_OBSERVATIONS] = np.nan
+
+    present = ~np.isnan(returns)
+    values = np.nan_to_num(returns)
+    n, sx, sxx = (rolling_sums(v, VOLATILITY_WINDOW) for v in (present.astype(float), values, values * values))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (sxx - sx * sx / n) / (n - 1)
+    volatility = np.sqrt(np.clip(variance, 0, None) * periods_per_year)
+    volatility[n < VOLATILITY_WINDOW // 2] = np.nan
+
+    rows = min(len(beta), len(volatility))
+    return beta[-rows:], np.clip(correlation[-rows:], -1, 1), volatility[-rows:]
+
+def update(conn, interval="1d"):
+    """
+    Recompute and persist the statistics of an interval from the stored closes. Returns the number of pairs.
+    """
+    create_tables(conn)
+    open_times, symbols, closes = close_matrix(conn, interval)
+    if BENCHMARK not in symbols:
+        return 0
+    returns = log_returns(closes)
+    periods_per_year = 365 * 24 * 60 * 60_000 / kline_store.INTERVAL_MS[interval]
+
+    correlations, observations = correlation_matrix(returns[-CORRELATION_WINDOW:])
+    i, j = np.nonzero(~np.isnan(correlations) & ~np.eye(len(symbols), dtype=bool))
+    names = np.array(symbols, dtype=object)
+    correlation_rows = zip([interval] * len(i), names[i], names[j], correlations[i, j].tolist(), observations[i, j].tolist())
+
+    beta, correlation, volatility = rolling_stats(returns, returns[:, symbols.index(BENCHMARK)], periods_per_year)
+    history = min(HISTORY_PERIODS, len(beta))
+    times = open_times[-history:]
+    beta, correlation, volatility = beta[-history:], correlation[-history:], volatility[-history:]
+    t, k = np.nonzero(~(np.isnan(beta) & np.isnan(volatility)))
+    stats_rows = zip([interval] * len(t), names[k], times[t].tolist(), beta[t, k].tolist(),
+                     correlation[t, k].tolist(), volatility[t, k].tolist())
+
+    # Readers (WAL) keep seeing the previous results until the new ones are committed
+    with conn:
+        conn.execute("DELETE FROM asset_correlations WHERE interval = ?", (interval,))
+        conn.executemany("INSERT INTO asset_correlations VALUES (?, ?, ?, ?, ?)", correlation_rows)
+        conn.execute("DELETE FROM asset_stats WHERE interval = ?", (interval,))
+        conn.executemany("INSERT INTO asset_stats VALUES (?, ?, ?, ?, ?, ?)", stats_rows)
+    return len(symbols)
+
+def latest_stats(conn, interval="1d"):
+    # Latest row of every pair
+    return pd.read_sql_query("""SELECT symbol, beta, correlation, volatility FROM asset_stats s
+                                WHERE interval = ? AND open_time = (SELECT MAX(open_time) FROM asset_stats
+                                                                    WHERE interval = s.interval AND symbol = s.symbol)
+                                ORDER BY symbol""", conn, params=(interval,))
+
+def symbol_history(conn, symbol, interval="1d"):
+    data = pd.read_sql_query("""SELECT open_time, beta, correlation, volatility FROM asset_stats
+                                WHERE interval = ? AND symbol = ? ORDER BY open_time""", conn, params=(interval, symbol))
+    data["open_time"] = pd.to_datetime(data["open_time"], unit='ms')
+    return data
+
+def correlations_of(conn, symbol, interval="1d"):
+    return pd.read_sql_query("""SELECT symbol_b AS symbol, correlation, observations FROM asset_correlations
+                                WHERE interval = ? AND symbol_a = ? ORDER BY correlation DESC""", conn, params=(interval, symbol))
+
+def correlation_table(conn, symbols, interval="1d"):
+    # Square correlation matrix of the given pairs, 1 on the diagonal
+    placeholders = ', '.join('?' * len(symbols))
+    data = pd.read_sql_query(f"""SELECT symbol_a, symbol_b, correlation FROM asset_correlations
+                                 WHERE interval = ? AND symbol_a IN ({placeholders}) AND symbol_b IN ({placeholders})""",
+                             conn, params=(interval, *symbols, *symbols))
+    values = data.pivot(index="symbol_a", columns="symbol_b", values="correlation").reindex(index=symbols, columns=symbols).to_numpy(copy=True)
+    np.fill_diagonal(values, 1.0)
+    return pd.DataFrame(values, index=symbols, columns=symbols)
@@ -0,0 +1,53 @@
+# Libraries
+import os
+import sqlite3
+import threading
+import pandas as pd
+import streamlit as st
+from pathlib import Path
+
+# Shared read layer for the SQLite backed pages.
+# One read-only connection per database and process, results cached until the database changes.
+
+@st.cache_resource(show_spinner=False)
+def get_connection(db_path):
+    """
+    Read-only connection shared by every session of this process, with the lock serialising its use.
+    The feeds open the databases in WAL mode, so reads never block their writes.
+    """
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    return conn, threading.Lock()
+
+def db_version(db_path):
+    # Writes land in the -wal file until a checkpoint, so both files make up the version
+    version = 0
+    for path in (str(db_path), f"{db_path}-wal"):
+        try:
+            version = max(version, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return version
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _cached_read(db_path, version, reader_key, args, _reader):
+    conn, lock = get_connection(db_path)
+    with lock:
+        return _reader(conn, *args)
+
+def read(db_path, reader, *args):
+    """
+    Call reader(conn, *args) on the shared connection, cached until the database file changes.
+    """
+    db_path = str(Path(db_path).resolve())
+    return _cached_read(db_path, db_version(db_path), f"{reader.__module__}.{reader.__qualname__}", args, reader)
+
+def _query(conn, query, params):
+    return pd.read_sql_query(query, conn, params=params)
+
+def read_query(db_path, query, params=()):
+    """
+    Run a SELECT on the shared connection and return a DataFrame, cached until the database file changes.
+    """
+    return read(db_path, _query, query, tuple(params))
@@ -0,0 +1,90 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+# Chart payloads are capped server-side: beyond a couple of candles per pixel the browser only
+# spends time rendering detail nobody can see. Budgets assume the ~1200px wide layout of the pages.
+CHART_WIDTH = 1200
+MAX_CANDLES = CHART_WIDTH // 2
+MAX_LINE_POINTS = CHART_WIDTH
+
+# Bucket widths candles are re-aggregated to, in ms - the smallest one fitting the budget is used
+BUCKET_MS = [
+    60_000, 5 * 60_000, 15 * 60_000, 30 * 60_000,
+    60 * 60_000, 2 * 60 * 60_000, 4 * 60 * 60_000, 12 * 60 * 60_000,
+    24 * 60 * 60_000, 3 * 24 * 60 * 60_000, 7 * 24 * 60 * 60_000, 14 * 24 * 60 * 60_000,
+    30 * 24 * 60 * 60_000, 91 * 24 * 60 * 60_000,
+]
+
+# How each column of a bucket is built - any other column keeps its last value
+AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+    "num_trades": "sum",
+}
+
+def bucket_width(start, end, max_points):
+    # Smallest bucket width (ms) that fits the time span in max_points buckets
+    span = (pd.Timestamp(end) - pd.Timestamp(start)) / pd.Timedelta(milliseconds=1)
+    for width in BUCKET_MS:
+        if span / width < max_points:
+            return width
+    return int(np.ceil(span / max_points))
+
+def resample_ohlcv(data, max_points=MAX_CANDLES, time_column="open_time"):
+    """
+    Re-aggregate candles into coarser time buckets (e.g. 1d -> 3d / 1w) so at most max_points remain.
+    open/high/low/close/volume are combined as OHLCV, other columns keep the bucket's last value.
+    The time column holds each bucket's first timestamp. Data within the budget is returned unchanged.
+    """
+    if len(data) <= max_points:
+        return data
+    times = pd.to_datetime(data[time_column])
+    width = bucket_width(times.iloc[0], times.iloc[-1], max_points)
+    keys = times.astype("datetime64[ms]").astype("int64") // width
+
+    aggregations = {column: AGGREGATIONS.get(column, "last") for column in data.columns}
+    aggregations[time_column] = "first"
+    return data.groupby(keys.to_numpy(), sort=True).agg(aggregations).reset_index(drop=True)
+
+def lttb(x, y, max_points=MAX_LINE_POINTS):
+    """
+    Largest-Triangle-Three-Buckets: indices of the max_points samples that best keep the shape of a line.
+    x must be increasing (numbers or datetimes), NaN values of y are ignored.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if x.dtype == object:
+        x = pd.to_datetime(x).to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ms]").astype("int64")
+    x = x.astype(float)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= max_points or max_points < 3:
+        return valid
+
+    x, y = x[valid], y[valid]
+    # First and last points are kept, the rest is split in max_points - 2 buckets
+    edges = np.linspace(1, len(x) - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, len(x) - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third vertex of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else len(x)
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return valid[selected]
+
+def downsample_line(data, column, max_points=MAX_LINE_POINTS, time_column="open_time"):
+    """
+    Rows of data kept by LTTB on one line series.
+    """
+    return data.iloc[lttb(data[time_column], data[column], max_points)]
@@ -0,0 +1,185 @@
+# Libraries
+import json
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from extras import http_client
+
+# Local copy of the Etherscan transactions of every address looked up in the Wallet Explorer.
+# Records are stored as returned by Etherscan, keyed by (address, kind, hash, log_index), with a
+# high-water block per address and kind - a repeat lookup only asks for the blocks after it.
+dir_path = Path(__file__).parent.resolve()
+db_path = dir_path / '..' / 'dbs' / 'etherscan.db'
+
+ETHERSCAN_API_URL = "https://api.etherscan.io/api"
+# Etherscan action of each kind of transaction
+ACTIONS = {"eth": "txlist", "erc20": "tokentx"}
+# Etherscan returns at most 10000 records per call
+PAGE_SIZE = 10000
+END_BLOCK = 99999999
+# Parallel block ranges for addresses with more than PAGE_SIZE records - the api.etherscan.io bucket paces them
+SHARDS = 4
+
+# Typed frame of the records - fields left out (input, blockHash, ...) are never loaded
+ADDRESS_COLUMNS = ["from", "to", "contractAddress"]
+INTEGER_COLUMNS = ["blockNumber", "timeStamp", "logIndex", "gasUsed", "isError", "tokenDecimal"]
+CATEGORY_COLUMNS = ["methodId", "functionName", "tokenName", "tokenSymbol"]
+FRAME_COLUMNS = ["hash", *INTEGER_COLUMNS, *ADDRESS_COLUMNS, "value", "gasPrice", *CATEGORY_COLUMNS]
+
+def connect(path=db_path):
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Normal transactions carry no logIndex - stored as -1
+    conn.execute('''CREATE TABLE IF NOT EXISTS transactions (
+        address TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        hash TEXT NOT NULL,
+        log_index INTEGER NOT NULL,
+        block_number INTEGER NOT NULL,
+        record TEXT NOT NULL,
+        PRIMARY KEY (address, kind, hash, log_index)
+    ) WITHOUT ROWID''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS sync_state (
+        address TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        last_block INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL,
+        PRIMARY KEY (address, kind)
+    )''')
+    conn.commit()
+    return conn
+
+def last_block(conn, address, kind):
+    row = conn.execute("SELECT last_block FROM sync_state WHERE address = ? AND kind = ?", (address, kind)).fetchone()
+    return row[0] if row else None
+
+def fetch_page(address, kind, api_key, startblock, endblock, sort="asc"):
+    # One call - at most PAGE_SIZE records between two blocks (inclusive)
+    params = {"module": "account", "action": ACTIONS[kind], "address": address, "startblock": startblock,
+              "endblock": endblock, "sort": sort, "apikey": api_key}
+    response = http_client.get(ETHERSCAN_API_URL, params=params)
+    if response.status_code == 429:  # 429 is often used to indicate too many requests
+        raise Exception("Rate limit exceeded.")
+    response.raise_for_status()
+    result = response.json()['result']
+    # Errors come back as a message in place of the list
+    if isinstance(result, str):
+        raise Exception("Rate limit exceeded." if "rate limit" in result.lower() else result)
+    return result
+
+def latest_block(api_key):
+    response = http_client.get(ETHERSCAN_API_URL, params={"module": "proxy", "action": "eth_blockNumber", "apikey": api_key})
+    response.raise_for_status()
+    return int(response.json()['result'], 16)
+
+def fetch_block(address, kind, api_key, block):
+    """
+    Every record of a single block holding PAGE_SIZE or more records - read from both ends.
+    """
+    first = fetch_page(address, kind, api_key, block, block, sort="asc")
+    last = fetch_page(address, kind, api_key, block, block, sort="desc")
+    keys = {(record['hash'], record.get('logIndex')) for record in first}
+    if len(last) == PAGE_SIZE and (last[-1]['hash'], last[-1].get('logIndex')) not in keys:
+        raise Exception(f"Block {block} has more than {2 * PAGE_SIZE} transactions for this address.")
+    return first + [record for record in reversed(last) if (record['hash'], record.get('logIndex')) not in keys]
+
+def fetch_records(address, kind, api_key, startblock=0, endblock=None):
+    """
+    Every record of an address between two blocks (inclusive), oldest first.
+    A range returning a full page keeps its complete blocks, the rest of the range is split in
+    SHARDS block ranges fetched in parallel (and split again while they overflow). A single block
+    with a full page is read from both ends.
+    """
+    ranges = {}
+    with ThreadPoolExecutor(max_workers=SHARDS) as executor:
+        pending = {executor.submit(fetch_page, address, kind, api_key, startblock, endblock or END_BLOCK): (startblock, endblock)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, end = pending.pop(future)
+                result = future.result()
+                if len(result) < PAGE_SIZE:
+                    ranges[start] = result
+                    continue
+
+                # Blocks before the last one of the page are complete
+                last = int(result[-1]['blockNumber'])
+                ranges[start] = [record for record in result if int(record['blockNumber']) < last]
+                if end is None:
+                    end = max(latest_block(api_key), last)
+                if last >= end:
+                    ranges[last] = fetch_block(address, kind, api_key, last)
+                    continue
+                # The rest of the range in SHARDS parallel block ranges
+                step = -(-(end + 1 - last) // SHARDS)
+                for shard_start in range(last, end + 1, step):
+                    shard_end = min(shard_start + step - 1, end)
+                    pending[executor.submit(fetch_page, address, kind, api_key, shard_start, shard_end)] = (shard_start, shard_end)
+    return [record for start in sorted(ranges) for record in ranges[start]]
+
+def sync(conn, address, kind, api_key):
+    """
+    Store the records of an address newer than its high-water block. Returns the number of records fetched.
+    The high-water block itself is fetched again - records already stored are replaced, never duplicated.
+    """
+    start = last_block(conn, address, kind)
+    records = fetch_records(address, kind, api_key, startblock=start or 0)
+    rows = [(address, kind, record['hash'], int(record.get('logIndex', -1)), int(record['blockNumber']), json.dumps(record))
+            for record in records]
+    high_water = max([row[4] for row in rows] + ([start] if start is not None else [0]))
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)", (address, kind, high_water, int(time.time())))
+    return len(rows)
+
+def load(conn, address, kind):
+    # Stored records of an address in Etherscan order (block, then log index)
+    rows = conn.execute("""SELECT record FROM transactions WHERE address = ? AND kind = ?
+                           ORDER BY block_number, log_index""", (address, kind)).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+def transactions(address, kind, api_key, path=db_path):
+    """
+    All records of an address ('eth' or 'erc20'), synced with Etherscan first.
+    """
+    address = address.lower()
+    conn = connect(path)
+    try:
+        sync(conn, address, kind, api_key)
+        return load(conn, address, kind)
+    finally:
+        conn.close()
+
+def numbers(values, dtype):
+    # Decimal strings cast in one go, parsed one by one only when some are missing or malformed (then 0)
+    try:
+        return values.astype(dtype)
+    except (ValueError, TypeError):
+        return pd.to_numeric(values, errors='coerce').fillna(0).astype(dtype)
+
+def frame(records):
+    """
+    Records as a compact typed DataFrame: addresses categorical over one shared set of addresses,
+    block numbers, timestamps and other counters int64, value in ETH (or token units) and gasPrice
+    in wei as float64 - every conversion is vectorized.
+    """
+    columns = [column for column in FRAME_COLUMNS if not records or column in records[0]]
+    df = pd.DataFrame.from_records(records, columns=columns)
+    for column in df.columns.intersection(INTEGER_COLUMNS):
+        df[column] = numbers(df[column], 'int64')
+    decimals = df['tokenDecimal'].to_numpy() if 'tokenDecimal' in df.columns else 18
+    df['value'] = numbers(df['value'], 'float64') / np.power(10.0, decimals)
+    df['gasPrice'] = numbers(df['gasPrice'], 'float64')
+
+    # One category set shared by every address column - comparisons and concatenations stay categorical
+    addresses = list(df.columns.intersection(ADDRESS_COLUMNS))
+    codes, uniques = pd.factorize(pd.concat([df[column] for column in addresses], ignore_index=True).str.lower())
+    for i, column in enumerate(addresses):
+        df[column] = pd.Categorical.from_codes(codes[i * len(df):(i + 1) * len(df)], uniques)
+    for column in df.columns.intersection(CATEGORY_COLUMNS):
+        df[column] = df[column].astype('category')
+    return df
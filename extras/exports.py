@@ -0,0 +1,109 @@
+# Libraries
+import csv
+import io
+import sqlite3
+import tempfile
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from openpyxl import Workbook
+
+from extras import kline_store
+
+# Exports stream straight from SQLite in chunks: memory stays flat whatever the date range,
+# and nothing is generated until a download is requested.
+CHUNK_SIZE = 5000
+EPOCH = datetime(1970, 1, 1)
+
+def connect(db_path):
+    # Dedicated read-only connection - a long export never holds the pages' shared connection
+    return sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+
+def temporary_file():
+    # Export file on disk, unbuffered (io.FileIO) - st.download_button takes it as is, without a copy in the page
+    return tempfile.TemporaryFile(buffering=0)
+
+def query_rows(conn, symbol, interval, start, end):
+    """
+    Column names and a generator over a pair's klines and indicators, fetched CHUNK_SIZE rows at a time.
+    open_time / close_time are converted from ms to datetimes.
+    """
+    sql, params, columns = kline_store.klines_query(symbol, interval, start, end, with_indicators=True)
+    cursor = conn.execute(sql, params)
+
+    def rows():
+        while True:
+            chunk = cursor.fetchmany(CHUNK_SIZE)
+            if not chunk:
+                break
+            for row in chunk:
+                row = list(row)
+                row[0] = EPOCH + timedelta(milliseconds=row[0])
+                row[6] = EPOCH + timedelta(milliseconds=row[6])
+                yield row
+
+    return columns, rows()
+
+def write_csv(conn, symbol, interval, start, end, text_file):
+    writer = csv.writer(text_file)
+    columns, rows = query_rows(conn, symbol, interval, start, end)
+    writer.writerow(columns)
+    for row in rows:
+        row[0] = row[0].isoformat(sep=' ', timespec='milliseconds')
+        row[6] = row[6].isoformat(sep=' ', timespec='milliseconds')
+        writer.writerow(row)
+
+def csv_file(db_path, symbol, interval, start, end):
+    """
+    CSV (UTF-8) export of one pair as a binary file object, rewound and ready for st.download_button.
+    The caller closes it, which deletes the file.
+    """
+    output = temporary_file()
+    text_file = io.TextIOWrapper(io.BufferedWriter(output), encoding='utf-8', newline='')
+    conn = connect(db_path)
+    try:
+        write_csv(conn, symbol, interval, start, end, text_file)
+    finally:
+        conn.close()
+    text_file.flush()
+    text_file.detach().detach()
+    output.seek(0)
+    return output
+
+def excel_file(db_path, symbol, interval, start, end):
+    """
+    XLSX export of one pair - openpyxl write-only mode streams rows instead of building the sheet in memory.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(symbol)
+    conn = connect(db_path)
+    try:
+        columns, rows = query_rows(conn, symbol, interval, start, end)
+        sheet.append(columns)
+        for row in rows:
+            sheet.append(row)
+    finally:
+        conn.close()
+    output = temporary_file()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+def zip_file(db_path, symbols, interval, start, end):
+    """
+    ZIP with one CSV per pair - each member is streamed into the archive as it is read.
+    """
+    output = temporary_file()
+    conn = connect(db_path)
+    try:
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for symbol in symbols:
+                with archive.open(f"{symbol}_{interval}_price_data.csv", 'w') as member:
+                    text_file = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                    write_csv(conn, symbol, interval, start, end, text_file)
+                    text_file.flush()
+                    text_file.detach()
+    finally:
+        conn.close()
+    output.seek(0)
+    return output
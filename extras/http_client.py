@@ -0,0 +1,116 @@
+# Libraries
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+# Shared HTTP client for every fetcher: one pooled keep-alive Session, a token bucket per API host,
+# timeouts, and jittered exponential backoff on 429 / 5xx / network errors.
+
+# Request budget per host - (tokens, per seconds). Requests acquire their weight before being sent.
+HOST_LIMITS = {
+    # 6000 request weight per minute per IP, half is kept for the web app and manual use
+    "api.binance.com": (3000, 60),
+    # Public API - about 10 calls per minute
+    "api.coingecko.com": (10, 60),
+    # Free plan - 5 calls per second
+    "api.etherscan.io": (5, 1),
+}
+
+TIMEOUT = (5, 30)  # connect, read
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket shared by all threads - acquire(weight) blocks until the budget allows the request.
+    """
+    def __init__(self, tokens, per_seconds=60):
+        self.capacity = tokens
+        self.tokens = tokens
+        self.rate = tokens / per_seconds
+        self.updated = time.monotonic()
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    self.used += weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self):
+        # The server says the budget is spent (429) - the next requests wait for a refill
+        with self.lock:
+            self.tokens = 0
+            self.updated = time.monotonic()
+
+
+_session = None
+_buckets = {}
+_lock = threading.Lock()
+
+def session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            # Enough pooled connections per host for the fetchers' thread pools
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def limiter(host):
+    """
+    Token bucket of a host, None for hosts without a known quota.
+    """
+    with _lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(*HOST_LIMITS[host]) if host in HOST_LIMITS else None
+        return _buckets[host]
+
+def set_limit(host, tokens, per_seconds=60):
+    # Replace the budget of a host, e.g. a paid API plan configured by a feed
+    with _lock:
+        _buckets[host] = TokenBucket(tokens, per_seconds)
+
+def backoff(attempt, response=None):
+    # Retry-After when the server sends one, full jitter exponential backoff otherwise
+    if response is not None and response.headers.get("Retry-After", "").isdigit():
+        return min(float(response.headers["Retry-After"]), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def get(url, params=None, weight=1, timeout=TIMEOUT, retries=MAX_RETRIES, **kwargs):
+    """
+    GET through the shared session within the host's budget. 429 / 5xx responses and network errors
+    are retried with backoff - the last response is returned (status unchecked), the last network error raised.
+    """
+    bucket = limiter(urlsplit(url).hostname)
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire(weight)
+        try:
+            response = session().get(url, params=params, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(backoff(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        if response.status_code == 429 and bucket is not None:
+            bucket.drain()
+        time.sleep(backoff(attempt, response))
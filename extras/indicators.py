@@ -0,0 +1,102 @@
+# Libraries
+import json
+import math
+from collections import deque
+
+# Indicators maintained by the Binance feed for every pair, stored in the 'indicators' table of trading_data.db.
+SMA_WINDOWS = (50, 100, 200)
+RSI_WINDOW = 14
+STOCHRSI_WINDOW = 14
+INDICATOR_COLUMNS = [f"sma_{window}" for window in SMA_WINDOWS] + ["rsi", "stochrsi"]
+
+
+class IndicatorState:
+    """
+    Rolling state of one pair - enough to extend SMA / RSI / StochRSI by one candle in O(1).
+    SMAs keep running sums over the last closes, RSI uses Wilder smoothing (seeded with a simple mean).
+    """
+    def __init__(self, closes=(), sums=None, prev_close=None, deltas=0, avg_gain=0.0, avg_loss=0.0, rsis=()):
+        self.closes = deque(closes, maxlen=max(SMA_WINDOWS))
+        self.sums = sums or {window: sum(list(self.closes)[-window:]) for window in SMA_WINDOWS}
+        self.prev_close = prev_close
+        self.deltas = deltas
+        self.avg_gain = avg_gain
+        self.avg_loss = avg_loss
+        self.rsis = deque(rsis, maxlen=STOCHRSI_WINDOW)
+
+    def update(self, close):
+        # SMAs - add the new close, drop the close leaving each window
+        for window in SMA_WINDOWS:
+            self.sums[window] += close
+            if len(self.closes) >= window:
+                self.sums[window] -= self.closes[-window]
+        self.closes.append(close)
+        smas = [self.sums[window] / window if len(self.closes) >= window else None for window in SMA_WINDOWS]
+
+        # RSI - simple average of the first RSI_WINDOW moves, Wilder smoothing afterwards
+        rsi = None
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            self.deltas += 1
+            if self.deltas <= RSI_WINDOW:
+                self.avg_gain += gain / RSI_WINDOW
+                self.avg_loss += loss / RSI_WINDOW
+            else:
+                self.avg_gain = (self.avg_gain * (RSI_WINDOW - 1) + gain) / RSI_WINDOW
+                self.avg_loss = (self.avg_loss * (RSI_WINDOW - 1) + loss) / RSI_WINDOW
+            if self.deltas >= RSI_WINDOW:
+                if self.avg_loss == 0:
+                    rsi = 100.0 if self.avg_gain > 0 else 50.0
+                else:
+                    rsi = 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+        self.prev_close = close
+
+        # StochRSI - position of the RSI within its range over the last STOCHRSI_WINDOW values
+        stochrsi = None
+        if rsi is not None:
+            self.rsis.append(rsi)
+            if len(self.rsis) == STOCHRSI_WINDOW:
+                min_rsi, max_rsi = min(self.rsis), max(self.rsis)
+                stochrsi = (rsi - min_rsi) / (max_rsi - min_rsi) if max_rsi > min_rsi else None
+
+        return smas + [rsi, stochrsi]
+
+    def to_json(self):
+        # Sums are recomputed from the stored closes so floating point drift never outlives a run
+        return json.dumps({
+            "closes": list(self.closes),
+            "prev_close": self.prev_close,
+            "deltas": self.deltas,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "rsis": list(self.rsis),
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(**json.loads(text))
+
+
+def update_indicators(conn, symbol, interval="1d"):
+    """
+    Extend the stored indicators of a pair with every candle newer than its saved state.
+    Runs inside the caller's transaction - the feed commits it together with the klines.
+    """
+    row = conn.execute("SELECT open_time, state FROM indicator_state WHERE symbol = ? AND interval = ?",
+                       (symbol, interval)).fetchone()
+    last_open_time, state = (row[0], IndicatorState.from_json(row[1])) if row else (-1, IndicatorState())
+
+    candles = conn.execute("""SELECT open_time, close FROM klines
+                              WHERE symbol = ? AND interval = ? AND open_time > ?
+                              ORDER BY open_time""", (symbol, interval, last_open_time)).fetchall()
+    if not candles:
+        return 0
+
+    rows = [(symbol, interval, open_time, *state.update(close)) for open_time, close in candles
+            if close is not None and not math.isnan(close)]
+    conn.executemany(f"""INSERT OR REPLACE INTO indicators (symbol, interval, open_time, {', '.join(INDICATOR_COLUMNS)})
+                         VALUES (?, ?, ?, {', '.join('?' * len(INDICATOR_COLUMNS))})""", rows)
+    conn.execute("INSERT OR REPLACE INTO indicator_state VALUES (?, ?, ?, ?)",
+                 (symbol, interval, candles[-1][0], state.to_json()))
+    return len(rows)
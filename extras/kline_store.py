@@ -0,0 +1,231 @@
+# Libraries
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from extras.indicators import INDICATOR_COLUMNS
+
+# Get the absolute path to the directory of the current file.
+dir_path = Path(__file__).parent.resolve()
+db_path = dir_path / '..' / 'dbs' / 'trading_data.db'
+
+KLINE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume", "close_time", "num_trades"]
+
+# Candle length per supported interval, in ms
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+# Timestamps are stored as UTC epoch milliseconds, exactly as Binance returns them.
+# SQLite TIMESTAMP text from the legacy tables is converted with julianday().
+_TEXT_TO_MS = "CAST(ROUND((julianday({col}) - 2440587.5) * 86400000) AS INTEGER)"
+
+def connect(path=db_path):
+    """
+    Open the trading database for writing and make sure the klines schema exists.
+    """
+    conn = sqlite3.connect(str(path))
+    # Sized for minute candles: larger pages for a fresh database (ignored once it exists),
+    # WAL with NORMAL sync so each backfill chunk commits without an fsync of the main file.
+    conn.execute("PRAGMA page_size = 8192")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    create_tables(conn)
+    return conn
+
+def create_tables(conn):
+    # One table for every pair and interval - the primary key doubles as the range index.
+    conn.execute('''CREATE TABLE IF NOT EXISTS klines (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        open_time INTEGER NOT NULL,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume REAL,
+        close_time INTEGER,
+        num_trades INTEGER,
+        PRIMARY KEY (symbol, interval, open_time)
+    ) WITHOUT ROWID''')
+    # Precomputed indicators (extras/indicators.py) - one row per candle, same key as klines
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS indicators (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        open_time INTEGER NOT NULL,
+        {' REAL, '.join(INDICATOR_COLUMNS)} REAL,
+        PRIMARY KEY (symbol, interval, open_time)
+    ) WITHOUT ROWID''')
+    # Rolling state per pair, so new candles extend the indicators without a full recompute
+    conn.execute('''CREATE TABLE IF NOT EXISTS indicator_state (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        open_time INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (symbol, interval)
+    )''')
+    # Resume cursor per pair and interval - the open_time (ms) the next fetch starts from.
+    # Also the catalogue of stored pairs, so listing them never scans klines.
+    conn.execute('''CREATE TABLE IF NOT EXISTS kline_checkpoints (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        next_open_time INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL,
+        PRIMARY KEY (symbol, interval)
+    )''')
+    conn.commit()
+
+def latest_open_time(conn, symbol, interval="1d"):
+    """
+    Latest stored open_time (ms) for a pair, None if the pair has no rows yet.
+    """
+    row = conn.execute("""SELECT open_time FROM klines WHERE symbol = ? AND interval = ?
+                          ORDER BY open_time DESC LIMIT 1""", (symbol, interval)).fetchone()
+    return row[0] if row else None
+
+def get_checkpoint(conn, symbol, interval="1d"):
+    """
+    open_time (ms) the next fetch of a pair should start from, None for a pair never fetched.
+    Pairs stored before checkpoints existed resume right after their latest candle.
+    """
+    row = conn.execute("SELECT next_open_time FROM kline_checkpoints WHERE symbol = ? AND interval = ?",
+                       (symbol, interval)).fetchone()
+    if row:
+        return row[0]
+    latest = latest_open_time(conn, symbol, interval)
+    return latest + 1 if latest is not None else None
+
+def set_checkpoint(conn, symbol, interval, next_open_time):
+    conn.execute("INSERT OR REPLACE INTO kline_checkpoints VALUES (?, ?, ?, ?)",
+                 (symbol, interval, int(next_open_time), int(time.time() * 1000)))
+
+def write_chunk(conn, symbol, interval, data):
+    """
+    Write a chunk of closed candles and move the pair's checkpoint past it in one transaction,
+    so an interrupted backfill resumes exactly after the last chunk written.
+    """
+    with conn:
+        rows = write_klines(conn, symbol, interval, data)
+        set_checkpoint(conn, symbol, interval, int(data["open_time"].max()) + 1)
+    return rows
+
+def write_klines(conn, symbol, interval, data):
+    """
+    Upsert a klines DataFrame (KLINE_COLUMNS, times in ms) for one pair. Returns rows written.
+    """
+    rows = [(symbol, interval, *row) for row in data[KLINE_COLUMNS].itertuples(index=False, name=None)]
+    conn.executemany("INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def klines_query(symbol, interval="1d", start=None, end=None, with_indicators=False):
+    """
+    SELECT for a pair's klines between two dates (inclusive, on open_time) - returns (sql, params, columns).
+    with_indicators adds the precomputed INDICATOR_COLUMNS.
+    """
+    start_ms = 0 if start is None else to_ms(start)
+    end_ms = 2**62 if end is None else to_ms(end)
+    columns = list(KLINE_COLUMNS)
+    join = ""
+    if with_indicators:
+        columns += INDICATOR_COLUMNS
+        join = "LEFT JOIN indicators i ON i.symbol = k.symbol AND i.interval = k.interval AND i.open_time = k.open_time"
+    select = [f"k.{column}" for column in KLINE_COLUMNS] + [f"i.{column}" for column in columns[len(KLINE_COLUMNS):]]
+    sql = f"""SELECT {', '.join(select)} FROM klines k {join}
+              WHERE k.symbol = ? AND k.interval = ? AND k.open_time BETWEEN ? AND ?
+              ORDER BY k.open_time"""
+    return sql, (symbol, interval, start_ms, end_ms), columns
+
+def read_klines(conn, symbol, interval="1d", start=None, end=None, with_indicators=False):
+    """
+    Read a pair's klines between two dates (inclusive, on open_time) as a DataFrame with datetime columns.
+    with_indicators adds the precomputed INDICATOR_COLUMNS.
+    """
+    sql, params, _ = klines_query(symbol, interval, start, end, with_indicators)
+    data = pd.read_sql_query(sql, conn, params=params)
+    data["open_time"] = pd.to_datetime(data["open_time"], unit='ms')
+    data["close_time"] = pd.to_datetime(data["close_time"], unit='ms')
+    return data
+
+def matrices(conn, interval="1d", end=None, periods=1, fields=("close",)):
+    """
+    Fields of every stored pair over the `periods` candles ending at open_time `end` (ms, default: latest stored).
+    Returns (open_times, symbols, {field: (periods x pairs) array}) - NaN where a pair has no candle.
+    Fields are klines columns or INDICATOR_COLUMNS.
+    """
+    if end is None:
+        row = conn.execute("SELECT MAX(next_open_time) FROM kline_checkpoints WHERE interval = ?", (interval,)).fetchone()
+        if row[0] is None:
+            return np.array([], dtype=np.int64), [], {field: np.empty((0, 0)) for field in fields}
+        end = row[0] - 1
+    step = INTERVAL_MS[interval]
+    start = end - (periods - 1) * step
+    select = [f"i.{field}" if field in INDICATOR_COLUMNS else f"k.{field}" for field in fields]
+    join = ""
+    if any(field in INDICATOR_COLUMNS for field in fields):
+        join = "LEFT JOIN indicators i ON i.symbol = k.symbol AND i.interval = k.interval AND i.open_time = k.open_time"
+    # Driven by the checkpoints catalogue, so every pair is a primary key range seek
+    data = pd.read_sql_query(f"""SELECT k.symbol, k.open_time, {', '.join(select)} FROM kline_checkpoints c
+                                 JOIN klines k ON k.symbol = c.symbol AND k.interval = c.interval {join}
+                                 WHERE c.interval = ? AND k.open_time BETWEEN ? AND ?""",
+                             conn, params=(interval, start, end))
+    codes, symbols = pd.factorize(data["symbol"], sort=True)
+    rows = (data["open_time"].to_numpy() - start) // step
+    values = {}
+    for field in fields:
+        values[field] = np.full((periods, len(symbols)), np.nan)
+        values[field][rows, codes] = data[field].to_numpy(dtype=float, na_value=np.nan)
+    return start + np.arange(periods, dtype=np.int64) * step, list(symbols), values
+
+def date_range(conn, symbol, interval="1d"):
+    """
+    First and last close_time of a pair as Timestamps - two primary key seeks.
+    """
+    dates = []
+    for order in ("ASC", "DESC"):
+        row = conn.execute(f"""SELECT close_time FROM klines WHERE symbol = ? AND interval = ?
+                               ORDER BY open_time {order} LIMIT 1""", (symbol, interval)).fetchone()
+        dates.append(pd.to_datetime(row[0] if row else None, unit='ms'))
+    return tuple(dates)
+
+def list_symbols(conn, interval="1d"):
+    rows = conn.execute("SELECT symbol FROM kline_checkpoints WHERE interval = ? ORDER BY symbol", (interval,)).fetchall()
+    return [row[0] for row in rows]
+
+def list_intervals(conn):
+    rows = conn.execute("SELECT DISTINCT interval FROM kline_checkpoints").fetchall()
+    return sorted((row[0] for row in rows), key=lambda interval: INTERVAL_MS.get(interval, 0))
+
+def to_ms(value):
+    return int(pd.Timestamp(value).timestamp() * 1000)
+
+def migrate_pair_tables(conn, logger=None):
+    """
+    One-shot migration of the legacy per-pair tables (pair_<SYMBOL>, daily candles) into klines.
+    Each table is copied and dropped in the same transaction, so the migration can be re-run safely.
+    """
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'pair\\_%' ESCAPE '\\'")]
+    for table_name in tables:
+        symbol = table_name.replace("pair_", "", 1)
+        with conn:
+            cursor = conn.execute(f'''INSERT OR REPLACE INTO klines
+                SELECT ?, '1d', {_TEXT_TO_MS.format(col='open_time')}, open, high, low, close, volume,
+                       {_TEXT_TO_MS.format(col='close_time')}, CAST(num_trades AS INTEGER)
+                FROM {table_name} WHERE open_time IS NOT NULL''', (symbol,))
+            latest = latest_open_time(conn, symbol, "1d")
+            if latest is not None:
+                set_checkpoint(conn, symbol, "1d", latest + 1)
+            conn.execute(f"DROP TABLE {table_name}")
+        if logger:
+            logger.info(f"Migrated {table_name} into klines - Rows: {cursor.rowcount}")
+    return len(tables)
+
+if __name__ == '__main__':
+    # python -m extras.kline_store - run the migration by hand
+    with connect() as conn:
+        print(f"Migrated {migrate_pair_tables(conn)} tables")
@@ -0,0 +1,40 @@
+# Libraries
+import numpy as np
+import plotly.graph_objects as go
+
+BULLISH_FILL = 'rgba(0,250,0,0.4)'
+BEARISH_FILL = 'rgba(250,0,0,0.4)'
+
+def regime_fill_traces(df, fast='sma_50', slow='sma_200'):
+    """
+    Fill between two averages, green while fast > slow and red otherwise - always two traces.
+    Every regime (run of candles on the same side) becomes one closed polygon: forward along `fast`,
+    back along `slow`, then a gap. The polygons of each colour share a single fill='toself' trace.
+    """
+    label = (df[fast] > df[slow]).to_numpy()
+    # Regimes are split on label changes only, candles without both averages are then left out
+    group = np.concatenate(([0], np.cumsum(label[1:] != label[:-1])))
+    keep = (df[fast].notna() & df[slow].notna()).to_numpy()
+    x, group, label = df.index.to_numpy()[keep], group[keep], label[keep]
+    fast_values, slow_values = df[fast].to_numpy()[keep], df[slow].to_numpy()[keep]
+    position = np.arange(len(x))
+
+    # Sort keys (group, leg, order): leg 0 walks fast forward, leg 1 walks slow backward, leg 2 is the gap
+    groups = np.unique(group)
+    group_label = label[np.searchsorted(group, groups)]
+    keys_group = np.concatenate((group, group, groups))
+    keys_leg = np.concatenate((np.zeros(len(x)), np.ones(len(x)), np.full(len(groups), 2)))
+    keys_order = np.concatenate((position, -position, np.zeros(len(groups))))
+    order = np.lexsort((keys_order, keys_leg, keys_group))
+
+    xs = np.concatenate((x, x, np.full(len(groups), None, dtype=object)))[order]
+    if np.issubdtype(x.dtype, np.datetime64):
+        # Shortest ISO strings ('2023-01-01' for daily candles) - plotly writes datetimes to the microsecond
+        strings = np.datetime_as_string(x.astype('datetime64[ms]'), unit='auto')
+        xs = np.concatenate((strings, strings, np.full(len(groups), None))).astype(object)[order]
+    ys = np.concatenate((fast_values, slow_values, np.full(len(groups), np.nan)))[order].astype(float)
+    bullish = np.concatenate((label, label, group_label))[order]
+
+    return [go.Scatter(x=xs[mask], y=ys[mask], fill='toself', fillcolor=color, mode='lines',
+                       line=dict(color='rgba(0,0,0,0)'), name='', showlegend=False, hoverinfo='skip')
+            for mask, color in ((bullish, BULLISH_FILL), (~bullish, BEARISH_FILL))]
@@ -1,148 +1,176 @@
 import sqlite3
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import base64
 import os
 from PIL import Image
-import requests
 import io
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from extras import data_access, http_client
 
 dir_path = Path(__file__).parent.resolve()
 db_path = dir_path / '..' / 'dbs' / 'coingecko.db'
+thumbs_path = dir_path / 'assets_thumbs'
+THUMB_SIZE = (32, 32)
+
+# filename -> (mtime, data URL), loaded once per process from the 'thumbnails' table
+_thumbnail_cache = {}
 
 def fetch_data(db_path):
-    # Connect to the SQLite database
-    conn = sqlite3.connect(db_path)
-    # Fetch data from the database
+    # Fetch data from the database - shared read-only connection, cached until coingecko.db changes
     try:
-        df = pd.read_sql_query("SELECT * FROM markets", conn)
-        return df
+        df = data_access.read_query(db_path, "SELECT * FROM markets")
+        return df.copy()
     except Exception as e:
         print(f"An error occurred while fetching data: {e}")
         return None
-            
-def thumbnail_assets(image_url, symbol, size=(32, 32)):
-    # Use the provided symbol to create a unique filename.
-    filename = f"{symbol}_{size[0]}.png"
-    # Define the path where you'll save the images.
-    folder_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "assets_thumbs")
-    local_image_path = os.path.join(folder_path, filename)
-
-    # Ensure the directory exists
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
+
+def fetch_history(db_path, coin_id):
+    # Price / rank history of one coin from the snapshot table, oldest first
     try:
-        # Check if the image already exists locally.
-        if os.path.exists(local_image_path):
-            # If it does, open the image from the local file.
-            img = Image.open(local_image_path)
-            #print('Found ', symbol)
-        else:
-            # If it doesn't, download and save the image.
-            response = requests.get(image_url)
-            img = Image.open(io.BytesIO(response.content))
-            img = img.resize(size)
-            img.save(local_image_path, format="PNG")
-            #print('New Saved ', symbol)
-        # Create a BytesIO object
-        buffer = io.BytesIO()
-        # Save the resized image into the buffer
-        img.save(buffer, format="PNG")
-        # Get the content of the image in the buffer
-        img_str = buffer.getvalue()
-        # Base64 encode.
-        img_base64 = base64.b64encode(img_str)
-
-        # Return as data URL.
-        return f"data:image/png;base64,{img_base64.decode()}"
+        df = data_access.read_query(db_path, "SELECT * FROM market_snapshots WHERE id = ? ORDER BY snapshot_ts", (coin_id,)).copy()
+        df['snapshot_ts'] = pd.to_datetime(df['snapshot_ts'], unit='s')
+        return df
     except Exception as e:
-        print(f"Could not resize image {image_url}. Error: {e}")
+        print(f"An error occurred while fetching history: {e}")
         return None
-    
-def abbreviate_number(num):
-    if pd.isnull(num) or num == 0:
-        return 'None'
-    elif num >= 10**12:  # Trillion
-        return str(round(num / 10**12, 2)) + 'T'
-    elif num >= 10**9:  # Billion
-        return str(round(num / 10**9, 2)) + 'B'
-    elif num >= 10**6:  # Million
-        return str(round(num / 10**6, 2)) + 'M'
-    elif num >= 10**3:  # Thousand
-        return str(round(num / 10**3, 2)) + 'K'
-    else:
-        return str(num)
-
-def color_positive_negative(val):
-    if pd.isnull(val):
-        return ''
-    if isinstance(val, str):
-        val = float(val.replace(",", ""))
-    else:
-        val = float(val)
-    color = 'green' if val > 0 else ('red' if val < 0 else 'grey')
-    return 'background-color: %s' % color
-    
+
+def download_thumbnail(image_url, symbol, size=THUMB_SIZE):
+    # Download, resize and save a thumbnail under assets_thumbs/<SYMBOL>_<size>.png
+    local_image_path = thumbs_path / f"{symbol}_{size[0]}.png"
+    try:
+        response = http_client.get(image_url)
+        img = Image.open(io.BytesIO(response.content))
+        img = img.resize(size)
+        img.save(local_image_path, format="PNG")
+        return True
+    except Exception as e:
+        print(f"Could not resize image {image_url}. Error: {e}")
+        return False
+
+def download_thumbnails(images, size=THUMB_SIZE):
+    # images: {symbol: image_url} - fetched concurrently, they are independent small files
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return sum(executor.map(lambda item: download_thumbnail(item[1], item[0], size), images.items()))
+
+def thumbnail_index(db_path, size=THUMB_SIZE):
+    """
+    Map symbol -> PNG data URL for every thumbnail in assets_thumbs.
+    Encoded images are persisted in the 'thumbnails' table and only re-encoded when the file mtime changes.
+    """
+    suffix = f"_{size[0]}.png"
+    thumbs_path.mkdir(exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        if not _thumbnail_cache:
+            conn.execute("CREATE TABLE IF NOT EXISTS thumbnails (filename TEXT PRIMARY KEY, mtime REAL, data_url TEXT)")
+            _thumbnail_cache.update({filename: (mtime, data_url) for filename, mtime, data_url in conn.execute("SELECT filename, mtime, data_url FROM thumbnails")})
+
+        index, changed = {}, []
+        for entry in os.scandir(thumbs_path):
+            if not entry.name.endswith(suffix):
+                continue
+            mtime = entry.stat().st_mtime
+            cached = _thumbnail_cache.get(entry.name)
+            if cached is None or cached[0] != mtime:
+                data_url = f"data:image/png;base64,{base64.b64encode(Path(entry.path).read_bytes()).decode()}"
+                cached = _thumbnail_cache[entry.name] = (mtime, data_url)
+                changed.append((entry.name, mtime, data_url))
+            index[entry.name[:-len(suffix)]] = cached[1]
+
+        if changed:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?)", changed)
+        return index
+    finally:
+        conn.close()
+
+def abbreviate_numbers(values):
+    # Vectorized 1.23K / 4.56M / 7.89B / 1.01T labels - zero or missing values read 'None'
+    values = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=float)
+    conditions = [values >= 10**12, values >= 10**9, values >= 10**6, values >= 10**3]
+    divisor = np.select(conditions, [10**12, 10**9, 10**6, 10**3], default=1)
+    suffix = np.select(conditions, ['T', 'B', 'M', 'K'], default='')
+    labels = np.round(values / divisor, 2).astype(str).astype(object) + suffix
+    return np.where(values != 0, labels, 'None')
+
+def color_positive_negative(df):
+    # Background colours for a whole block of raw floats at once (Styler.apply with axis=None)
+    values = df.to_numpy(dtype=float)
+    colors = np.select([values > 0, values < 0, values == 0],
+                       ['background-color: green', 'background-color: red', 'background-color: grey'], default='')
+    return pd.DataFrame(colors, index=df.index, columns=df.columns)
+
+SELECTED_COLUMNS = [
+    'id',
+    'image', 
+    'market_cap_rank', 
+    'symbol', 
+    'name', 
+    'current_price', 
+    'total_volume', 
+    'market_cap',
+    'fully_diluted_valuation',
+    'circulating_supply',
+    'total_supply',
+    'max_supply',
+    'price_change_percentage_1h_in_currency',
+    'price_change_percentage_24h_in_currency',
+    'price_change_percentage_7d_in_currency',
+    'price_change_percentage_30d_in_currency', 
+    'price_change_percentage_1y_in_currency'
+]
+COLUMN_NAMES = ['id',
+                'Image', 
+                'Rank', 
+                'Symbol', 
+                'Name', 
+                'Current Price', 
+                '24h Volume',
+                'Market Cap',
+                'Fully Diluted Valuation',
+                'Circulating Supply',
+                'Total Supply',
+                'Max Supply',
+                '1h %',
+                '24h %',
+                '7d %',
+                '30d %',
+                '1y %',
+                ]
+INFO_COLUMNS = ['Market Cap','24h Volume','Fully Diluted Valuation', 'Circulating Supply', 'Total Supply', 'Max Supply']
+PERCENTAGE_COLUMNS = ['1h %', '24h %', '7d %', '30d %', '1y %']
+
+def transform_markets(df):
+    # Rename and format the markets table - Current Price and % columns stay float64 for column_config
+    df = df[SELECTED_COLUMNS].copy()
+    df.columns = COLUMN_NAMES
+
+    df['Symbol'] = df['Symbol'].str.upper()
+    numeric = df[INFO_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    df['Percentage In Circulation'] = (numeric['Circulating Supply'] / numeric['Max Supply']) * 100
+    df['Current Price'] = pd.to_numeric(df['Current Price'], errors='coerce')
+    df[PERCENTAGE_COLUMNS] = df[PERCENTAGE_COLUMNS].apply(pd.to_numeric, errors='coerce').round(2)
+    for column in INFO_COLUMNS:
+        df[column] = abbreviate_numbers(numeric[column])
+    return df.sort_values('Rank')
+
+def style_markets(df):
+    return df.style.apply(color_positive_negative, axis=None, subset=PERCENTAGE_COLUMNS)
+
 def process_data_gecko():
     df = fetch_data(db_path)
     latest_timestamp = max(df['last_updated'])
     latest_timestamp = datetime.strptime(latest_timestamp, '%Y-%m-%dT%H:%M:%S.%fZ').strftime('%Y/%m/%d - %H:%M:%S UTC')
 
-    selected_columns = [
-        'id',
-        'image', 
-        'market_cap_rank', 
-        'symbol', 
-        'name', 
-        'current_price', 
-        'total_volume', 
-        'market_cap',
-        'fully_diluted_valuation',
-        'circulating_supply',
-        'total_supply',
-        'max_supply',
-        'price_change_percentage_1h_in_currency',
-        'price_change_percentage_24h_in_currency',
-        'price_change_percentage_7d_in_currency',
-        'price_change_percentage_30d_in_currency', 
-        'price_change_percentage_1y_in_currency'
-    ]
-    column_names = ['id',
-                    'Image', 
-                    'Rank', 
-                    'Symbol', 
-                    'Name', 
-                    'Current Price', 
-                    '24h Volume',
-                    'Market Cap',
-                    'Fully Diluted Valuation',
-                    'Circulating Supply',
-                    'Total Supply',
-                    'Max Supply',
-                    '1h %',
-                    '24h %',
-                    '7d %',
-                    '30d %',
-                    '1y %',
-                    ]
-
-
-    df = df[selected_columns]
-    df.columns = column_names
-
-    df['Symbol'] = df['Symbol'].str.upper()
-    df['Percentage In Circulation'] = (df['Circulating Supply']/df['Max Supply'])*100
-    df['Current Price'] = df['Current Price'].apply(lambda x: '{:,.12f}'.format(x).rstrip('0').rstrip('.'))
-    info_columns = ['Market Cap','24h Volume','Fully Diluted Valuation', 'Circulating Supply', 'Total Supply', 'Max Supply']
-    df[info_columns] = df[info_columns].apply(pd.to_numeric, errors='coerce')
-    df[info_columns] = df[info_columns].fillna(0)
-    df[info_columns] = df[info_columns].applymap(abbreviate_number)
-    df['Image'] = df.apply(lambda row: thumbnail_assets(row['Image'], row['Symbol']), axis=1)
-    percentage_columns = ['1h %', '24h %', '7d %', '30d %', '1y %']
-    df[percentage_columns] = df[percentage_columns].applymap(lambda x: '{:,.2f}'.format(x))
+    df = transform_markets(df)
+    thumbnails = thumbnail_index(db_path)
+    missing = df.loc[~df['Symbol'].isin(thumbnails.keys())]
+    if not missing.empty and download_thumbnails(dict(zip(missing['Symbol'], missing['Image']))):
+        thumbnails = thumbnail_index(db_path)
+    df['Image'] = df['Symbol'].map(thumbnails)
     df = df.drop(['id'], axis=1)
-    print(len(df))
-    df = df.sort_values('Rank')
-    df = df.style.applymap(color_positive_negative, subset=percentage_columns)
-    return df, latest_timestamp
\ No newline at end of file
+    return style_markets(df), latest_timestamp
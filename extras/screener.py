@@ -0,0 +1,77 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from extras import kline_store
+
+# Screener over every stored pair at once: the last candles of all pairs are loaded as
+# (candles x pairs) arrays and each condition is a vectorized expression over them.
+# SMAs and RSI are the ones maintained by the feed (extras/indicators.py), read from the indicators table.
+VOLUME_WINDOW = 20
+# Candles loaded per pair - enough for the volume average and the crossover lookback
+LOOKBACK = 60
+
+def signals(conn, interval="1d", fast="sma_50", slow="sma_200", volume_window=VOLUME_WINDOW, lookback=LOOKBACK):
+    """
+    Latest values and signals of every pair, one row per pair:
+    close, rsi, the fast / slow averages, volume_ratio (last volume / average of the previous volume_window)
+    and crossed_up / crossed_down (candles since fast last crossed above / below slow, NaN if not within lookback).
+    Pairs without a candle at the latest open_time are left out.
+    """
+    fields = ("close", "volume", "rsi", fast, slow)
+    open_times, symbols, values = kline_store.matrices(conn, interval, None, max(lookback, volume_window + 1), fields)
+    if not symbols:
+        return pd.DataFrame(columns=["symbol", "close", "rsi", fast, slow, "volume_ratio", "crossed_up", "crossed_down"])
+
+    close, volume = values["close"], values["volume"]
+    # Average over the candles each pair has - pairs with too short a history get NaN (0 / 0), not a warning
+    previous = volume[-volume_window - 1:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.nansum(previous, axis=0) / np.count_nonzero(~np.isnan(previous), axis=0)
+        volume_ratio = volume[-1] / average
+
+    # Crossovers - both averages known on consecutive candles, the sign of fast - slow flips
+    spread = np.sign(values[fast] - values[slow])
+    known = ~np.isnan(spread[1:]) & ~np.isnan(spread[:-1])
+    crossed_up = known & (spread[1:] > 0) & (spread[:-1] <= 0)
+    crossed_down = known & (spread[1:] < 0) & (spread[:-1] >= 0)
+
+    data = pd.DataFrame({
+        "symbol": symbols,
+        "close": close[-1],
+        "rsi": values["rsi"][-1],
+        fast: values[fast][-1],
+        slow: values[slow][-1],
+        "volume_ratio": volume_ratio,
+        "crossed_up": candles_since(crossed_up),
+        "crossed_down": candles_since(crossed_down),
+    })
+    return data[~np.isnan(close[-1])].reset_index(drop=True)
+
+def candles_since(events):
+    # Candles since the last True of every column (0 = latest candle), NaN when there is none
+    last = len(events) - 1 - np.argmax(events[::-1], axis=0)
+    return np.where(events.any(axis=0), len(events) - 1 - last, np.nan)
+
+def screen(conn, interval="1d", crossed_up_within=None, crossed_down_within=None, rsi_below=None, rsi_above=None,
+           min_volume_ratio=None, fast="sma_50", slow="sma_200", sort_by="volume_ratio", ascending=False):
+    """
+    Pairs matching every given condition, ranked by sort_by. Conditions left to None are not applied, e.g.
+    screen(conn, crossed_up_within=3, rsi_below=30, min_volume_ratio=2) - SMA50 crossed above SMA200 in the
+    last 3 candles, RSI < 30 and volume above twice its 20 candle average.
+    """
+    data = signals(conn, interval, fast, slow)
+    mask = np.ones(len(data), dtype=bool)
+    if crossed_up_within is not None:
+        mask &= data["crossed_up"] < crossed_up_within
+    if crossed_down_within is not None:
+        mask &= data["crossed_down"] < crossed_down_within
+    if rsi_below is not None:
+        mask &= data["rsi"] < rsi_below
+    if rsi_above is not None:
+        mask &= data["rsi"] > rsi_above
+    if min_volume_ratio is not None:
+        mask &= data["volume_ratio"] >= min_volume_ratio
+    result = data[mask].sort_values(sort_by, ascending=ascending, na_position="last", ignore_index=True)
+    result.insert(0, "rank", np.arange(1, len(result) + 1))
+    return result
@@ -0,0 +1,68 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+# Aggregation kernel of the Wallet Explorer: every transaction is tagged once with its direction
+# (out of / into the wallet) and counterparty, then grouped in a single pass over (keys, direction) -
+# keys are factorized into one group code and the sums are bincounts reshaped to one out / in column each.
+DIRECTIONS = ["out", "in"]
+
+def tag(df, address):
+    """
+    Row positions, direction (0 out, 1 in) and counterparty of the transactions of the wallet.
+    Transactions not involving the wallet are left out, a transfer to itself is both outgoing and incoming.
+    """
+    outgoing = (df['from'] == address).to_numpy()
+    incoming = (df['to'] == address).to_numpy()
+    rows = np.concatenate([np.flatnonzero(outgoing), np.flatnonzero(incoming)])
+    direction = np.repeat([0, 1], [outgoing.sum(), incoming.sum()])
+    counterparty = pd.concat([df['to'][outgoing], df['from'][incoming]], ignore_index=True)
+    return rows, direction, counterparty
+
+def aggregate(df, address, keys):
+    """
+    Number of transactions, value and gas of the outgoing and incoming transactions of the wallet per keys,
+    e.g. ['counterparty'] or ['tokenName']. One row per keys with count_out, value_out, gas_out, count_in,
+    value_in, gas_in - keys are categorical, counts int32.
+    """
+    rows, direction, counterparty = tag(df, address)
+    group = np.zeros(len(rows), dtype=np.int64)
+    codes = {}
+    for key in keys:
+        # Columns are factorized as stored (no conversion to Python strings), then indexed by row
+        if key == 'counterparty':
+            code, uniques = pd.factorize(counterparty, sort=True)
+        else:
+            code, uniques = pd.factorize(df[key], sort=True)
+            code = code[rows]
+        codes[key] = code, uniques
+        group = group * len(uniques) + code
+    group, _ = pd.factorize(group)
+    groups = group.max() + 1 if len(group) else 0
+
+    # First row of every group gives its keys - uniques of a categorical column come back as a
+    # CategoricalIndex, codes must be mapped onto its values (not onto its full category list)
+    first = np.empty(groups, dtype=np.int64)
+    first[group[::-1]] = np.arange(len(group))[::-1]
+    table = pd.DataFrame({key: pd.Categorical.from_codes(code[first], np.asarray(uniques)) for key, (code, uniques) in codes.items()})
+
+    cell = group * 2 + direction
+    sums = {'count': np.bincount(cell, minlength=groups * 2).astype(np.int32),
+            'value': np.bincount(cell, df['value'].to_numpy()[rows], minlength=groups * 2),
+            'gas': np.bincount(cell, df['gasPrice'].to_numpy()[rows], minlength=groups * 2)}
+    for measure, values in sums.items():
+        values = values.reshape(groups, 2)
+        for i, direction_name in enumerate(DIRECTIONS):
+            table[f"{measure}_{direction_name}"] = values[:, i]
+    return table[[*keys, 'count_out', 'value_out', 'gas_out', 'count_in', 'value_in', 'gas_in']]
+
+def counterparties(df, address, token=None):
+    # Outgoing / incoming transactions of the wallet per counterparty (and per token when a token column is given)
+    return aggregate(df, address, ['counterparty'] + ([token] if token else []))
+
+def holdings(df, address, token='tokenName'):
+    # Amount in / out and current holdings of every token
+    table = aggregate(df, address, [token])
+    table = table.rename(columns={'value_in': 'amount_in', 'value_out': 'amount_out'})
+    table['current_holdings'] = table['amount_in'] - table['amount_out']
+    return table[[token, 'amount_in', 'amount_out', 'current_holdings']].sort_values(token, ignore_index=True)
@@ -0,0 +1,121 @@
+# Libraries
+import sqlite3
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError
+from pathlib import Path
+
+# Local copy of the Yahoo Finance daily closes used by the Compare Crypto & Markets page.
+# 'coverage' records the date ranges already downloaded per ticker, so days without a close
+# (weekends, holidays) are never requested again and only the missing ranges hit the network.
+dir_path = Path(__file__).parent.resolve()
+db_path = dir_path / '..' / 'dbs' / 'yfinance.db'
+
+def connect(path=db_path):
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS prices (
+        ticker TEXT NOT NULL,
+        date TEXT NOT NULL,
+        adj_close REAL,
+        PRIMARY KEY (ticker, date)
+    ) WITHOUT ROWID''')
+    # Downloaded ranges per ticker, [start, end) as YYYY-MM-DD - kept merged, never overlapping
+    conn.execute('''CREATE TABLE IF NOT EXISTS coverage (
+        ticker TEXT NOT NULL,
+        start TEXT NOT NULL,
+        end TEXT NOT NULL,
+        PRIMARY KEY (ticker, start)
+    ) WITHOUT ROWID''')
+    conn.commit()
+    return conn
+
+def missing_ranges(conn, ticker, start, end):
+    """
+    Parts of [start, end) not downloaded yet for a ticker, as (start, end) date strings.
+    """
+    ranges = []
+    cursor = start
+    rows = conn.execute("SELECT start, end FROM coverage WHERE ticker = ? AND end > ? AND start < ? ORDER BY start",
+                        (ticker, start, end)).fetchall()
+    for covered_start, covered_end in rows:
+        if covered_start > cursor:
+            ranges.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        ranges.append((cursor, end))
+    return ranges
+
+def add_coverage(conn, ticker, start, end):
+    # Merge the new range with every range it overlaps or touches
+    rows = conn.execute("SELECT start, end FROM coverage WHERE ticker = ? AND end >= ? AND start <= ?",
+                        (ticker, start, end)).fetchall()
+    start = min([start] + [row[0] for row in rows])
+    end = max([end] + [row[1] for row in rows])
+    conn.execute("DELETE FROM coverage WHERE ticker = ? AND end >= ? AND start <= ?", (ticker, start, end))
+    conn.execute("INSERT INTO coverage VALUES (?, ?, ?)", (ticker, start, end))
+
+def download(tickers, start, end):
+    # Adjusted closes for [start, end) as a DataFrame - one column per ticker, DatetimeIndex
+    data = yf.download(list(tickers), start=start, end=end, auto_adjust=False, progress=False)['Adj Close']
+    if isinstance(data, pd.Series):
+        data = data.to_frame(tickers[0])
+    return data
+
+def closed_range(ticker, start, end):
+    """
+    True when Yahoo answers that a ticker has no price in [start, end) - only closed days (weekends, holidays).
+    False when the request failed (network error, rate limit, HTTP error status) or prices came back.
+    """
+    try:
+        data = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=False, raise_errors=True)
+    except YFPricesMissingError as error:
+        return 'status_code' not in (error.debug_info or '')
+    except Exception:
+        return False
+    return data.empty
+
+def fill(conn, tickers, start, end):
+    """
+    Download the missing ranges of the tickers - tickers missing the same range share one request.
+    Ranges downloaded without rows (only closed days) are covered too. Today is never marked as covered,
+    its close is not final yet, and neither are failed downloads.
+    """
+    end = min(end, pd.Timestamp.today().strftime('%Y-%m-%d'))
+    batches = {}
+    for ticker in tickers:
+        for missing in missing_ranges(conn, ticker, start, end):
+            batches.setdefault(missing, []).append(ticker)
+
+    for (range_start, range_end), range_tickers in batches.items():
+        data = download(range_tickers, range_start, range_end)
+        rows = [(ticker, date.strftime('%Y-%m-%d'), float(value))
+                for ticker in range_tickers if ticker in data
+                for date, value in data[ticker].dropna().items()]
+        # Tickers without rows are covered only when Yahoo confirms the range has no price - failed downloads are retried next time
+        downloaded = {row[0] for row in rows}
+        covered = [ticker for ticker in range_tickers
+                   if ticker in downloaded or closed_range(ticker, range_start, range_end)]
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?)", rows)
+            for ticker in covered:
+                add_coverage(conn, ticker, range_start, range_end)
+    return len(batches)
+
+def load_prices(tickers, start, end, path=db_path):
+    """
+    Adjusted closes of the tickers between start (inclusive) and end (exclusive), like yf.download(...)['Adj Close'].
+    Only the ranges not stored yet are downloaded.
+    """
+    start, end = pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')
+    conn = connect(path)
+    try:
+        fill(conn, tickers, start, end)
+        placeholders = ', '.join('?' * len(tickers))
+        data = pd.read_sql_query(f"""SELECT ticker, date, adj_close FROM prices
+                                     WHERE ticker IN ({placeholders}) AND date >= ? AND date < ?""",
+                                 conn, params=(*tickers, start, end))
+    finally:
+        conn.close()
+    data['date'] = pd.to_datetime(data['date'])
+    return data.pivot(index='date', columns='ticker', values='adj_close').reindex(columns=list(tickers)).sort_index()
@@ -1,17 +1,19 @@
 import requests
+import sqlite3
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
 from datetime import timedelta
 from PIL import Image
-from extras import logo_sidebar_lit
+from extras import logo_sidebar_lit, downsample, market_cycles, data_access, kline_store, http_client
 import os
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 logo_path = os.path.join(parent_dir, 'extras', 'logo.png')
 asset_thumbs_path = os.path.join(parent_dir, 'extras', 'assets_thumbs')
+coingecko_db_path = os.path.join(parent_dir, 'dbs', 'coingecko.db')
+trading_db_path = os.path.join(parent_dir, 'dbs', 'trading_data.db')
 st.set_page_config(page_title='🌟 BTC Market Cycles', page_icon='🌐', layout='wide',initial_sidebar_state='expanded')
 st.markdown(logo_sidebar_lit(logo_path, height=159), unsafe_allow_html=True)
 
@@ -34,47 +36,61 @@ st.markdown("***", unsafe_allow_html=True)
 
 ## COINGECKO 100 & 200 Weekly Simple Moving Average
 ## COINGECKO PROVIDES A WIDER TIMEFRAME - USEFULL TO CALCULATE WEEKLY MA
+## Stored in coingecko.db by the CoinGecko feed (extras/coingecko_feed.py)
 
 @st.cache_data(ttl=float(timedelta(minutes=30).total_seconds()))
 def get_figure():
-    def get_weekly_sma(coin_id):    
-        api_url = f'https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart?vs_currency=usd&days=max&interval=daily'
-        data = requests.get(api_url).json()
-        df = pd.DataFrame.from_records(list(data['prices']), columns =['Time', 'Price'])
-        df['Time'] = df['Time'].apply(pd.to_datetime, unit='ms')
-        window_100 = 50 * 7 # 100 weeks * 7 days per week
-        window_200 = 200 * 7 # 200 weeks * 7 days per week
-        df['SMA_W100'] = df['Price'].rolling(window=window_100).mean()
-        df['SMA_W200'] = df['Price'].rolling(window=window_200).mean()
-        df['Time'] = df['Time'].dt.date # extract the date part and store it in a new column "Date"
-        df = df[:-1]
+    def get_weekly_sma(coin_id):
+        # Daily history and its weekly averages are kept up to date by the CoinGecko feed (price_history)
+        try:
+            df = data_access.read_query(coingecko_db_path, """SELECT date AS Time, price AS Price, sma_350d AS SMA_W100, sma_1400d AS SMA_W200
+                                                               FROM price_history WHERE coin_id = ? ORDER BY date""", (coin_id,))
+        except (sqlite3.Error, pd.errors.DatabaseError):
+            # No price_history until the CoinGecko feed has run once - the chart is drawn without the weekly averages
+            st.info("The 200 Week SMA is not available yet - it appears after the next CoinGecko feed update.")
+            df = pd.DataFrame(columns=['Time', 'Price', 'SMA_W100', 'SMA_W200'])
+        df['Time'] = pd.to_datetime(df['Time']).dt.date
         return df
-    def get_symbol_data(symbol, tick_interval, limit):
-        api_url = 'https://api.binance.com/api/v3/klines?symbol='+symbol+'&interval='+tick_interval+'&limit='+limit
-        data = requests.get(api_url).json()
-        df = pd.DataFrame(data)
-        df = df.iloc[:,:11]
-        # Renaming columns
-        df.columns = ['Time', 
-                'open', 
-                'high', 
-                'low', 
-                'close', 
-                'volume',
-                'close_time',
-                'quote_asset_volume',
-                'number_of_trades',
-                'taker_buy_base_asset_volume',
-                'taker_buy_quote_asset_volume']
-        cols_to_convert = ['Time', 'close_time']
-        df[cols_to_convert] = df[cols_to_convert].apply(pd.to_datetime, unit='ms')
-        df['Time'] = df['Time'].dt.date
+    def fetch_klines(symbol, tick_interval, since):
+        # Candles opened since `since` (ms), straight from Binance - times in ms, as stored by the feed
+        api_url = 'https://api.binance.com/api/v3/klines'
+        data = http_client.get(api_url, params={'symbol': symbol, 'interval': tick_interval, 'startTime': since, 'limit': 1000}, weight=2).json()
+        df = pd.DataFrame(data, columns=range(12))
+        df = df[[0, 1, 2, 3, 4, 5, 6, 8]]
+        df.columns = kline_store.KLINE_COLUMNS
+        df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
+        df['num_trades'] = df['num_trades'].astype(int)
         return df
-    def ta_funcs(df):
-        df['sma_50'] = df.close.rolling(window=100).mean()
-        df['sma_200'] = df.close.rolling(window=200).mean()
+    def get_symbol_data(symbol, tick_interval, limit):
+        # Candles and averages stored by the Binance feed (trading_data.db), Binance only for the gap since the
+        # last stored candle - the gap is merged in memory, the feed remains the only writer of the store
+        start = pd.Timestamp.now('UTC').tz_localize(None).normalize() - limit * pd.Timedelta(milliseconds=kline_store.INTERVAL_MS[tick_interval])
+        try:
+            df = data_access.read(trading_db_path, kline_store.read_klines, symbol, tick_interval, start, None, True)
+        except (sqlite3.Error, pd.errors.DatabaseError):
+            # Fresh deploy - no trading_data.db (or tables) before the first feed run, everything comes from Binance
+            df = pd.DataFrame()
+        since = kline_store.to_ms(df['open_time'].iloc[-1]) + 1 if not df.empty else kline_store.to_ms(start)
+        # If Binance is unreachable the chart is drawn from the stored candles alone
+        try:
+            gap = fetch_klines(symbol, tick_interval, since)
+        except (requests.RequestException, ValueError):
+            if df.empty:
+                raise
+            gap = None
+        if gap is not None:
+            gap[['open_time', 'close_time']] = gap[['open_time', 'close_time']].apply(pd.to_datetime, unit='ms')
+            df = pd.concat([df, gap], ignore_index=True) if not df.empty else gap
+        df = df.tail(limit).reset_index(drop=True)
+        # Averages of the gap candles - the stored ones are precomputed
+        for window in (100, 200):
+            rolled = df['close'].rolling(window=window).mean()
+            df[f'sma_{window}'] = df[f'sma_{window}'].astype(float).fillna(rolled) if f'sma_{window}' in df else rolled
+        df['Time'] = df['open_time'].dt.date
+        # The fast average has always been drawn over 100 candles
+        df['sma_50'] = df['sma_100']
         return df
-    coin_data = ta_funcs(get_symbol_data('BTCUSDT', '1d', '1000'))
+    coin_data = get_symbol_data('BTCUSDT', '1d', 1000)
     weekly_sma = get_weekly_sma('bitcoin')
     final = coin_data.merge(weekly_sma, on='Time', how='left')
     cols_to_convert = ['SMA_W100',
@@ -85,10 +101,7 @@ def get_figure():
                     'high',
                     'low',
                     'close',
-                    'volume',
-                    'quote_asset_volume',
-                    'taker_buy_base_asset_volume',
-                    'taker_buy_quote_asset_volume']
+                    'volume']
     final[cols_to_convert] = final[cols_to_convert].astype(float)
     final[cols_to_convert] = final[cols_to_convert].applymap('{:.0f}'.format)
     final = final.tail(800)
@@ -96,41 +109,24 @@ def get_figure():
     df = final.copy()
     df.index = df.Time
     df = df[['close', 'sma_50', 'sma_200', 'SMA_W100', 'SMA_W200','open','high','low']]
+    # The 800 daily candles are drawn as they are - the chart reads them as daily bars (SMA 50/200 Daily Cross)
     df = df.astype(float)
     df1 = df.copy()
-    # split data into chunks where averages cross each other
-    df['label'] = np.where(df['sma_50']>df['sma_200'], 1, 0)
-    df['group'] = df['label'].ne(df['label'].shift()).cumsum()
-    df = df.groupby('group')
-    dfs = []
-    for name, data in df:
-        dfs.append(data)
-    # custom function to set fill color
-    def fillcol(label):
-        if label >= 1:
-            return 'rgba(0,250,0,0.4)'
-        else:
-            return 'rgba(250,0,0,0.4)'
     fig = go.Figure(data=go.Ohlc(x=df1.index,
                     open=df1.open,
                     high=df1.high,
                     low=df1.low,
                     close=df1.close, name='BTC'))
-    for df in dfs:
-        fig.add_traces(go.Scatter(x=df.index, y = df.sma_50, name='',showlegend = False,hoverinfo='skip',
-                                line = dict(color='rgba(0,0,0,0)')))
-        
-        fig.add_traces(go.Scatter(x=df.index, y = df.sma_200, name='',showlegend = False,hoverinfo='skip',
-                                line = dict(color='rgba(0,0,0,0)'),
-                                fill='tonexty', 
-                                fillcolor = fillcol(df['label'].iloc[0])))
-        
+    # green / red fill between the averages - two traces whatever the number of crossovers
+    fig.add_traces(market_cycles.regime_fill_traces(df))
+
     # include averages
     fig.add_traces(go.Scatter(x=df1.index, y = df1.sma_50, name='50D',
                             line = dict(color = 'teal', width=1)))
     fig.add_traces(go.Scatter(x=df1.index, y = df1.sma_200, name='200D',
                             line = dict(color = 'orange', width=1)))
-    fig.add_trace(go.Scatter(x=final.Time, y=final.SMA_W200,
+    weekly = downsample.downsample_line(final.astype({'SMA_W200': float}), 'SMA_W200', time_column='Time')
+    fig.add_trace(go.Scatter(x=weekly.Time, y=weekly.SMA_W200,
                         mode='lines',
                         name='200W SMA',
                         line = dict(color='yellow', width=2, dash='longdash')))
@@ -1,33 +1,23 @@
 import streamlit as st
 from streamlit_autorefresh import st_autorefresh
-import sqlite3
 import pandas as pd
 import plotly.graph_objects as go
-import io
-from extras import logo_sidebar_lit
+from extras import logo_sidebar_lit, kline_store, data_access, columnar_store, exports, downsample
 from pathlib import Path
 import os
 
 dir_path = Path(__file__).parent.resolve()
 db_path = dir_path / '..' / 'dbs' / 'trading_data.db'
 
-# Function to get data from the SQLite database
-def get_data(query, params=()):
-    with sqlite3.connect(db_path) as conn:
-        c = conn.cursor()
-        c.execute(query, params)
-        data = c.fetchall()
+# Reads go through the shared read-only connection and are cached until trading_data.db changes
+assets = data_access.read(db_path, kline_store.list_symbols, "1d")
+num_tables = len(assets)
 
-    return data
+# Query the first and latest date from BTCUSDT
+min_date, max_date = data_access.read(db_path, kline_store.date_range, "BTCUSDT", "1d")
 
-# Query the total number of tables
-num_tables = get_data("SELECT count(name) FROM sqlite_master WHERE type='table'")[0][0]
-
-# Query the first and latest date from "pair_BTCUSDT"
-min_date, max_date = get_data("SELECT MIN(close_time), MAX(close_time) FROM pair_BTCUSDT")[0]
-
-min_date = pd.to_datetime(min_date)
-max_date = pd.to_datetime(max_date)
+# Intervals ingested by the feed (binance_feed.INTERVALS)
+intervals = data_access.read(db_path, kline_store.list_intervals) or ["1d"]
 
 def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -48,7 +38,7 @@ def main():
         """
     st.markdown(hide_menu_style, unsafe_allow_html=True)
 
-    st.markdown(" ## Binance Historical Data - Daily Window")
+    st.markdown(" ## Binance Historical Data")
 
     # Add a markdown description
     st.markdown(
@@ -69,10 +59,12 @@ def main():
         """
     )
 
+    # Create a drop-down box with the available intervals
+    default_interval_index = intervals.index("1d") if "1d" in intervals else 0
+    selected_interval = st.selectbox("Select an interval", intervals, index=default_interval_index)
+
     # Create a drop-down box with all available assets
-    tables = get_data("SELECT name FROM sqlite_master WHERE type='table'")
-    assets = [table[0].replace("pair_", "") for table in tables]
-    sorted_assets = sorted(assets)
+    sorted_assets = sorted(data_access.read(db_path, kline_store.list_symbols, selected_interval))
 
     default_asset = 'BTCUSDT'
     default_asset_index = sorted_assets.index(default_asset) if default_asset in sorted_assets else 0
@@ -93,11 +85,14 @@ def main():
     )
 
     # Fetch the data for the selected asset
-    table_name = f"pair_{selected_asset}"
-    data = get_data(f"SELECT * FROM {table_name} WHERE close_time BETWEEN ? AND ?", (start_date, end_date))
-    data = pd.DataFrame(data, columns=["open_time", "open", "high", "low", "close", "volume", "close_time", "num_trades"])
-    data["open_time"] = pd.to_datetime(data["open_time"])
-    data["close_time"] = pd.to_datetime(data["close_time"])
+    # The end date is inclusive - keep every candle opened during that day
+    end_date = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+
+    # Columnar store first (memory-mapped Parquet), SQLite for pairs not exported yet
+    if columnar_store.has_symbol(selected_asset, selected_interval):
+        data = columnar_store.read_klines(selected_asset, selected_interval, start_date, end_date)
+    else:
+        data = data_access.read(db_path, kline_store.read_klines, selected_asset, selected_interval, start_date, end_date, True)
 
     if data.empty:
         st.warning("No data available for the selected timeframe.")
@@ -120,38 +115,18 @@ def main():
 
             # Calculate additional summary values
             percentage_change = round(((data["close"].iloc[-1] - data["open"].iloc[0]) / data["open"].iloc[0]) * 100, 2)
-            sma_50 = data["close"].rolling(window=50).mean().iloc[-1]
-            sma_200 = data["close"].rolling(window=200).mean().iloc[-1]
+            # SMA / RSI / StochRSI are precomputed over the full history by the feed (extras/indicators.py)
+            sma_50 = data["sma_50"].iloc[-1]
+            sma_200 = data["sma_200"].iloc[-1]
 
             if pd.isna(sma_200):
                 crossover_status = float('nan')
             else:
                 crossover_status = "Bullish" if sma_50 > sma_200 else "Bearish"
 
-            # Calculate RSI and StochRSI values
-
-            def rsi(close_prices, window=14):
-                delta = close_prices.diff()
-                gain = delta.where(delta > 0, 0)
-                loss = -delta.where(delta < 0, 0)
-                avg_gain = gain.rolling(window=window).mean()
-                avg_loss = loss.rolling(window=window).mean()
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-                return rsi
-
-            def stochrsi(rsi_values, window=14):
-                min_rsi = rsi_values.rolling(window=window).min()
-                max_rsi = rsi_values.rolling(window=window).max()
-                stochrsi = (rsi_values - min_rsi) / (max_rsi - min_rsi)
-                return stochrsi
-
-            rsi_values = rsi(data["close"])
-            stochrsi_values = stochrsi(rsi_values)
-
             # Get the latest RSI and StochRSI values
-            latest_rsi = rsi_values.iloc[-1]
-            latest_stochrsi = stochrsi_values.iloc[-1]
+            latest_rsi = data["rsi"].iloc[-1]
+            latest_stochrsi = data["stochrsi"].iloc[-1]
 
             # Add the additional summary values to the summary_data dictionary
             summary_data[selected_asset].extend([percentage_change, sma_50, sma_200, crossover_status, latest_rsi, latest_stochrsi])
@@ -193,23 +168,40 @@ def main():
             col1.write(colored_df)
 
             # Plot the OHLC graph in col2
-            fig = go.Figure(data=[go.Candlestick(x=data['close_time'],
-                            open=data['open'],
-                            high=data['high'],
-                            low=data['low'],
-                            close=data['close'])])
-            fig.update_layout(title='OHLC Candlestick Chart', xaxis_title='Date', yaxis_title='Price', xaxis_rangeslider_visible=False, margin=dict(l=0, r=0, t=30, b=0))
+            # Long ranges are re-aggregated to coarser candles (extras/downsample.py) - narrowing the dates brings the detail back
+            candles = downsample.resample_ohlcv(data)
+            fig = go.Figure(data=[go.Candlestick(x=candles['close_time'],
+                            open=candles['open'],
+                            high=candles['high'],
+                            low=candles['low'],
+                            close=candles['close'])])
+            chart_title = 'OHLC Candlestick Chart' if len(candles) == len(data) else f'OHLC Candlestick Chart - {len(data)} candles aggregated to {len(candles)}'
+            fig.update_layout(title=chart_title, xaxis_title='Date', yaxis_title='Price', xaxis_rangeslider_visible=False, margin=dict(l=0, r=0, t=30, b=0))
             col2.plotly_chart(fig, use_container_width=True)
 
-            # Add the Download CSV button
-            csv = data.to_csv(index=False)
-            st.download_button(label="Download CSV (UTF-8 encoding)", data=csv, file_name=f"{selected_asset}_price_data.csv", mime="text/csv")
-
-            # Add the Download Excel button
-            excel_file = io.BytesIO()  # Create an in-memory binary stream
-            data.to_excel(excel_file, index=False, engine='openpyxl')
-            excel_file.seek(0)  # Reset the file pointer to the beginning of the stream
-            st.download_button(label="Download Excel", data=excel_file.getvalue(), file_name=f"{selected_asset}_price_data.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            # Exports are generated on request only, streamed from SQLite in chunks (extras/exports.py)
+            export_col1, export_col2 = st.columns(2)
+            file_stem = f"{selected_asset}_{selected_interval}_price_data"
+            if export_col1.button("Prepare CSV"):
+                with st.spinner("Preparing CSV..."):
+                    csv_file = exports.csv_file(db_path, selected_asset, selected_interval, start_date, end_date)
+                # The file object is handed over as is and closed (deleted) once the button holds it
+                with csv_file:
+                    export_col1.download_button(label="Download CSV (UTF-8 encoding)", data=csv_file, file_name=f"{file_stem}.csv", mime="text/csv")
+            if export_col2.button("Prepare Excel"):
+                with st.spinner("Preparing Excel..."):
+                    excel_file = exports.excel_file(db_path, selected_asset, selected_interval, start_date, end_date)
+                with excel_file:
+                    export_col2.download_button(label="Download Excel", data=excel_file, file_name=f"{file_stem}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+            # Bulk export - one CSV per selected asset in a single ZIP
+            with st.expander("Bulk export"):
+                bulk_assets = st.multiselect("Select assets", sorted_assets, default=[selected_asset])
+                if bulk_assets and st.button("Prepare ZIP"):
+                    with st.spinner(f"Preparing {len(bulk_assets)} assets..."):
+                        zip_file = exports.zip_file(db_path, bulk_assets, selected_interval, start_date, end_date)
+                    with zip_file:
+                        st.download_button(label="Download ZIP", data=zip_file, file_name=f"binance_{selected_interval}_price_data.zip", mime="application/zip")
 
         display_summary_and_charts(data, selected_asset)
     
@@ -1,8 +1,7 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import plotly.graph_objects as go
-from extras import logo_sidebar_lit
+from extras import logo_sidebar_lit, yf_cache
 import os
 
 def main():
@@ -27,7 +26,6 @@ def main():
     start = st.date_input('Start Date', value = pd.to_datetime('2023-01-01'))
     end = st.date_input('Start Date', value = pd.to_datetime('today'))
 
-    tickers = ('^GSPC','^IXIC','^DJI','^STOXX','^FTSE','000001.SS','GC=F','SI=F','BTC-USD', 'ETH-USD', 'BNB-USD', 'XRP-USD', 'ADA-USD', 'DOGE-USD', 'MATIC-USD', 'SOL-USD', 'DOT-USD', 'SHIB-USD')
     # Create a dictionary mapping ticker symbols to names
     ticker_to_name = {
         '^GSPC': 'S&P 500',
@@ -68,7 +66,8 @@ def main():
     
 
     if len(assets) > 0:
-        df = relativeret((yf.download(tickers,start,end)['Adj Close']))
+        # Selected tickers only, served from the local cache - only dates never downloaded hit Yahoo Finance
+        df = relativeret(yf_cache.load_prices(assets, start, end))
         dfs = {}
         for asset in assets:
             df_ = df.loc[:, [asset]]
@@ -56,6 +56,11 @@ def main():
         column_config={
             "Image": st.column_config.ImageColumn(
                 "Image"),
+            "Current Price": st.column_config.NumberColumn(
+                "Current Price",
+                format="%.10g"),
+            **{column: st.column_config.NumberColumn(column, format="%.2f")
+               for column in process_data_coingecko.PERCENTAGE_COLUMNS},
             "Percentage In Circulation": st.column_config.ProgressColumn(
                 "Percentage In Circulation",
                 help='Circulating Supply / Max Supply',
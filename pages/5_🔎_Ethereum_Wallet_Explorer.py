@@ -1,5 +1,4 @@
 import streamlit as st
-import requests
 import pandas as pd
 import json
 import plotly.graph_objects as go
@@ -7,7 +6,8 @@ import numpy as np
 import os
 import re
 import time
-from extras import logo_sidebar_lit
+from concurrent.futures import ThreadPoolExecutor
+from extras import logo_sidebar_lit, http_client, etherscan_store, wallet_analytics
 import plotly.subplots as sp
 
 script_dir = os.path.dirname(os.path.abspath(''))
@@ -36,94 +36,23 @@ def get_balance(address, api_key):
     Fetch balance for a given Ethereum address.
     """
     url = f"https://api.etherscan.io/api?module=account&action=balance&address={address}&tag=latest&apikey={api_key}"
-    response = requests.get(url)
+    response = http_client.get(url)
     balance = response.json()['result'] if response.status_code == 200 else '0'
-    time.sleep(1)
     return float(balance) / 1e18  # convert from Wei to Ether
 
 def get_transactions_eth(address, api_key):
     """
     Fetch transactions for a given Ethereum address.
+    Served from the local store (extras/etherscan_store.py) - only blocks after the last lookup are fetched.
     """
-    startblock = 0
-    all_transactions = []
-
-    while True:
-        url = f"https://api.etherscan.io/api?module=account&action=txlist&address={address}&startblock={startblock}&endblock=99999999&sort=asc&apikey={api_key}"
-        response = requests.get(url)
-        if response.status_code == 429:  # 429 is often used to indicate too many requests
-            raise Exception("Rate limit exceeded.")
-        
-        if response.status_code == 200:
-            result = response.json()['result']
-            if not result:  # if no more transactions, break the loop
-                break
-
-            all_transactions.extend(result)
-
-            # Check if the number of transactions equals to the limit of 10000 
-            # which means we might have more transactions in the latest block.
-            if len(result) == 10000:
-                last_block = int(result[-1]['blockNumber'])
-                # Filter transactions of the latest block
-                latest_block_transactions = [t for t in result if int(t['blockNumber']) == last_block]
-                if len(latest_block_transactions) == 10000:  # If we have 10000 transactions in the latest block
-                    raise Exception(f"Block {last_block} has more transactions than fetched. Please adjust the function to handle this case.")
-                # Otherwise, increment the startblock
-                else:
-                    startblock = last_block + 1
-            # If we have less than 10000 transactions, increment the startblock
-            else:
-                startblock = int(result[-1]['blockNumber']) + 1
-        else:
-            break
-
-        # sleep for 1 second to avoid hitting rate limits
-        time.sleep(1)
-
-    return all_transactions
+    return etherscan_store.transactions(address, 'eth', api_key)
 
 def get_transactions_erc20(address, api_key):
     """
     Fetch ERC20 transactions for a given Ethereum address.
+    Served from the local store (extras/etherscan_store.py) - only blocks after the last lookup are fetched.
     """
-    startblock = 0
-    all_transactions = []
-
-    while True:
-        url = f"https://api.etherscan.io/api?module=account&action=tokentx&address={address}&startblock={startblock}&endblock=99999999&sort=asc&apikey={api_key}"
-        response = requests.get(url)
-        if response.status_code == 429:  # 429 is often used to indicate too many requests
-            raise Exception("Rate limit exceeded.")
-        
-        if response.status_code == 200:
-            result = response.json()['result']
-            if not result:  # if no more transactions, break the loop
-                break
-
-            all_transactions.extend(result)
-
-            # Check if the number of transactions equals to the limit of 10000 
-            # which means we might have more transactions in the latest block.
-            if len(result) == 10000:
-                last_block = int(result[-1]['blockNumber'])
-                # Filter transactions of the latest block
-                latest_block_transactions = [t for t in result if int(t['blockNumber']) == last_block]
-                if len(latest_block_transactions) == 10000:  # If we have 10000 transactions in the latest block
-                    raise Exception(f"Block {last_block} has more transactions than fetched. Please adjust the function to handle this case.")
-                # Otherwise, increment the startblock
-                else:
-                    startblock = last_block + 1
-            # If we have less than 10000 transactions, increment the startblock
-            else:
-                startblock = int(result[-1]['blockNumber']) + 1
-        else:
-            break
-
-        # sleep for 1 second to avoid hitting rate limits
-        time.sleep(1)
-
-    return all_transactions
+    return etherscan_store.transactions(address, 'erc20', api_key)
 
 
 
@@ -154,8 +83,11 @@ def map_methodId(df):
                     '0xfb488204':'Multi Send ETH',
                     '0xb6f9de95':'Swap Exact ETH for Tokens Supporting Fee on Trx Tokens',
                     }
-    df['methodId'] = df['methodId'].map(methodId_dict)
-    df['methodId'] = df['methodId'].fillna('Unknown')
+    # Mapped once per distinct methodId, the column stays categorical - a missing one (code -1) maps to the trailing 'Unknown'
+    methods = df['methodId'].astype('category')
+    labels = [methodId_dict.get(method, 'Unknown') for method in methods.cat.categories]
+    categories, label_codes = np.unique(np.array(labels + ['Unknown'], dtype=object), return_inverse=True)
+    df['methodId'] = pd.Categorical.from_codes(label_codes[methods.cat.codes], categories)
     return df
 
 def major_tokens():
@@ -169,40 +101,23 @@ def major_tokens():
     return major_token_list 
 
 def holdings_erc20(address, df, major_token_filter = False):
-    address = address.lower()
-    df_out = df.loc[df['from'].isin([address])]
-    df_out = df_out.groupby(['tokenName']).agg(amount_out=('value', 'sum')).reset_index()
-
-    df_in = df.loc[df['to'].isin([address])]
-    df_in = df_in.groupby(['tokenName']).agg(amount_in=('value', 'sum')).reset_index()
-
-    df_holdings = pd.merge(df_in, df_out, on='tokenName', how='outer')
-    # Fill NaN values with 0
-    df_holdings.fillna(0, inplace=True)
-    # Subtract the two columns
-    df_holdings['current_holdings'] = df_holdings['amount_in'] - df_holdings['amount_out']
+    df_holdings = wallet_analytics.holdings(df, address.lower())
     
     if major_token_filter:
         df_holdings = df_holdings.loc[df_holdings['tokenName'].isin(major_tokens())]
     cols_to_convert = ['current_holdings','amount_in','amount_out']
     df_holdings[cols_to_convert] = df_holdings[cols_to_convert].round(2)
     
-    
-    # Compute sum for each column
-    total_current_holdings = df_holdings['current_holdings'].sum()
-    total_amount_in = df_holdings['amount_in'].sum()
-    total_amount_out = df_holdings['amount_out'].sum()
-
     # Create a new DataFrame for the 'Total' row
     total_row = pd.DataFrame({
         'tokenName': ['Total'],
-        'current_holdings': [total_current_holdings],
-        'amount_in': [total_amount_in],
-        'amount_out': [total_amount_out]
+        'amount_in': [df_holdings['amount_in'].sum()],
+        'amount_out': [df_holdings['amount_out'].sum()],
+        'current_holdings': [df_holdings['current_holdings'].sum()]
     })
 
     # Concatenate the original DataFrame and the 'Total' row DataFrame
-    df_holdings = pd.concat([df_holdings, total_row], ignore_index=True)
+    df_holdings = pd.concat([df_holdings.astype({'tokenName': str}), total_row], ignore_index=True)
 
     
     df_holdings.columns = ['Token Name','Amount In', 'Amount Out', 'Current Holdings']
@@ -230,19 +145,16 @@ def convert_floats(df):
 def dataframe_clearing(address, trxs):
     """
     Dataframe Clearing - required address and trxs dataframe
+    Records are parsed into a typed frame (extras/etherscan_store.py) - values already in ETH / token units.
     """
-    df = pd.DataFrame(trxs)
-    df = df[df['value'] != '0']
-    df['value'] = df['value'].astype(float)
-    df['gasPrice'] = df['gasPrice'].astype(float) / 1e15  # convert from Kwei to Ether
+    df = etherscan_store.frame(trxs)
+    df = df[df['value'] != 0]
+    df['gasPrice'] = df['gasPrice'] / 1e15  # convert from Kwei to Ether
     
     if 'tokenDecimal' in df.columns:
-        df['tokenDecimal'] = df['tokenDecimal'].astype(float)
-        df['value'] = df['value']/10**df['tokenDecimal'] # convert real value of erc20 token using provided decimal
         return df
     
     if 'methodId' in df.columns: # map eth trx with description (not avl for erc20)
-        df['value'] = df['value'] / 1e18  # convert from wei to Ether
         return map_methodId(df)
     
     df = convert_timestamp(df)
@@ -251,56 +163,23 @@ def dataframe_clearing(address, trxs):
     return df
 
 def group_transactions(df, address, transaction_type):
+    """
+    Outgoing / incoming transactions of the wallet per counterparty (extras/wallet_analytics.py) - per token for ERC20.
+    """
+    address = address.lower()
     if transaction_type == 'ETH':
-        outgoing_df = df[df['from'] == address].groupby('to').agg({'hash': 'count', 'value': 'sum', 'gasPrice': 'sum'}).reset_index()
-        incoming_df = df[df['to'] == address].groupby('from').agg({'hash': 'count', 'value': 'sum', 'gasPrice': 'sum'}).reset_index()
-        outgoing_df.columns = ['address', 'num_outgoing_transactions', 'total_value_outgoing_trxs','total_gas_paid_outgoing']
-        incoming_df.columns = ['address', 'num_incoming_transactions', 'total_value_incoming_trxs','total_gas_paid_incoming']
-        df_grouped_columns = ['Address', '# Out Trx', 'ETH Out ','Gas Paid Out Trx', '# In Trx', 'ETH In','Gas Paid In Trx']
-        
+        df_grouped = wallet_analytics.counterparties(df, address)
+        df_grouped.columns = ['Address', '# Out Trx', 'ETH Out ','Gas Paid Out Trx', '# In Trx', 'ETH In','Gas Paid In Trx']
+        sort_column = 'ETH In'
     elif transaction_type == 'ERC20':
         df = df.loc[df['tokenName'].isin(['Dai Stablecoin', 'USD Coin', 'Tether USD', 'TrueUSD'])]
-        incoming_df = df[df['to'] == address.lower()].groupby(['from', 'tokenName']).agg({'hash': 'count', 'value': 'sum', 'gasPrice': 'sum'}).reset_index()
-        outgoing_df = df[df['from'] == address.lower()].groupby(['to', 'tokenName']).agg({'hash': 'count', 'value': 'sum', 'gasPrice': 'sum'}).reset_index()
-        outgoing_df.columns = ['address', 'erc20_token','num_outgoing_transactions', 'amount','total_gas_paid_outgoing']
-        incoming_df.columns = ['address', 'erc20_token','num_incoming_transactions', 'amount','total_gas_paid_incoming']
-        df_grouped_columns = ['Address','Outgoing ECR20-Token', '# Outgoing Trx', 'Amount Outgoing','ETH Gas Paid Outgoing Trx','Incoming ECR20-Token', '# Incoming Trx', 'Amount Incoming','ETH Gas Paid Incoming Trx']
+        df_grouped = wallet_analytics.counterparties(df, address, token='tokenName')
+        df_grouped.columns = ['Address', 'ECR20-Token', '# Outgoing Trx', 'Amount Outgoing','ETH Gas Paid Outgoing Trx', '# Incoming Trx', 'Amount Incoming','ETH Gas Paid Incoming Trx']
+        sort_column = 'Amount Incoming'
     else:
         raise ValueError(f"Unsupported transaction type: {transaction_type}")
 
-    if transaction_type == 'ETH':
-        unique_addresses = pd.concat([df['from'], df['to']]).unique()
-        outgoing_df = outgoing_df.set_index('address').reindex(unique_addresses).reset_index().fillna(0)
-        incoming_df = incoming_df.set_index('address').reindex(unique_addresses).reset_index().fillna(0)
-
-    df_grouped = pd.merge(outgoing_df, incoming_df, how='outer', on='address')
-    df_grouped.columns = df_grouped_columns
-    df_grouped = df_grouped.loc[~(df_grouped.iloc[:, 1:] == 0).all(axis=1)]
-
-    if transaction_type == 'ERC20':
-        if df_grouped['# Outgoing Trx'].sum() == 0:
-                df_grouped['Address'] = df_grouped['ETH Gas Paid Outgoing Trx']
-                df_grouped['ETH Gas Paid Outgoing Trx'] = np.nan
-
-
-    df_grouped = df_grouped.fillna(0)
-
-    sort_column = 'ETH In' if transaction_type == 'ETH' else 'Amount Incoming'
-    df_grouped = df_grouped.sort_values(sort_column, ascending=False)
-
-    if transaction_type == 'ETH':
-        df_grouped['# Out Trx'] = pd.to_numeric(df_grouped['# Out Trx'], downcast='integer', errors='coerce')
-        df_grouped['# In Trx'] = pd.to_numeric(df_grouped['# In Trx'], downcast='integer', errors='coerce')
-        df_grouped['ETH In'] = pd.to_numeric(df_grouped['ETH In'], downcast='float', errors='coerce')
-        df_grouped['ETH Out '] = pd.to_numeric(df_grouped['ETH Out '], downcast='float', errors='coerce')
-
-    if transaction_type == 'ERC20':
-        df_grouped['# Outgoing Trx'] = pd.to_numeric(df_grouped['# Outgoing Trx'], downcast='integer', errors='coerce')
-        df_grouped['# Incoming Trx'] = pd.to_numeric(df_grouped['# Incoming Trx'], downcast='integer', errors='coerce')
-        df_grouped['Amount Incoming'] = pd.to_numeric(df_grouped['Amount Incoming'], downcast='float', errors='coerce')
-        df_grouped['Amount Outgoing'] = pd.to_numeric(df_grouped['Amount Outgoing'], downcast='float', errors='coerce')
-
-    return df_grouped
+    return df_grouped.sort_values(sort_column, ascending=False, kind='stable', ignore_index=True)
 
 
 #Plotly Figures
@@ -352,24 +231,17 @@ def erc20_pies(df_holdings, address):
 def erc20_sankey(df_holdings, address):
     df_holdings = df_holdings.drop(df_holdings.index[-1])
     labels = ["Amount In", "Amount Out", "Current Holdings"] + list(df_holdings['Token Name'])
-    sources, targets, values, customdata = [], [], [], []
-    
-    for i, row in df_holdings.iterrows():
-        if row['Amount In'] > 0:
-            sources.append(0)
-            targets.append(labels.index(row['Token Name']))
-            values.append(row['Amount In'])
-            customdata.append(row['Token Name'])
-        if row['Amount Out'] > 0:
-            sources.append(labels.index(row['Token Name']))
-            targets.append(1)
-            values.append(row['Amount Out'])
-            customdata.append(row['Token Name'])
-        if row['Current Holdings'] > 0:
-            sources.append(labels.index(row['Token Name']))
-            targets.append(2)
-            values.append(row['Current Holdings'])
-            customdata.append(row['Token Name'])
+    # Token nodes follow the 3 fixed nodes - one link per token and flow with a positive amount
+    tokens = np.arange(3, len(labels))
+    names = df_holdings['Token Name'].to_numpy()
+    flows = [(np.zeros_like(tokens), tokens, df_holdings['Amount In'].to_numpy()),
+             (tokens, np.ones_like(tokens), df_holdings['Amount Out'].to_numpy()),
+             (tokens, np.full_like(tokens, 2), df_holdings['Current Holdings'].to_numpy())]
+    positive = [values > 0 for _, _, values in flows]
+    sources = np.concatenate([source[mask] for (source, _, _), mask in zip(flows, positive)])
+    targets = np.concatenate([target[mask] for (_, target, _), mask in zip(flows, positive)])
+    values = np.concatenate([values[mask] for (_, _, values), mask in zip(flows, positive)])
+    customdata = np.concatenate([names[mask] for mask in positive])
     
     fig = go.Figure(data=[go.Sankey(
         arrangement="snap",
@@ -414,19 +286,28 @@ def eth_sankey(df, address):
     # Compute the total absolute value of transactions for each address
     address_values = df.groupby('from')['abs_value'].sum().add(df.groupby('to')['abs_value'].sum(), fill_value=0)
     top_addresses = address_values.nlargest(25).index
-    other_addresses = address_values.index.difference(top_addresses)
 
     # Replace addresses not in top_addresses with 'Other'
-    df['from'] = df['from'].where(df['from'].isin(top_addresses), 'Other')
-    df['to'] = df['to'].where(df['to'].isin(top_addresses), 'Other')
-    
-    unique_addresses = pd.concat([df['from'], df['to']]).unique()
+    for column in ['from', 'to']:
+        df[column] = df[column].astype('category').cat.set_categories([*top_addresses, 'Other']).fillna('Other')
     
-    incoming_counts = df['to'].value_counts().reindex(unique_addresses).fillna(0).astype(int)
-    outgoing_counts = df['from'].value_counts().reindex(unique_addresses).fillna(0).astype(int)
-    labels = [(address[:6]+'...'+address[-4:] if address not in ['Other'] else address) + ' - Incoming: ' + str(incoming_counts[address]) + ', Outgoing: ' + str(outgoing_counts[address]) for address in unique_addresses]
+    # Node index of every 'from' and 'to' in one pass - first appearance order, as unique()
+    codes, unique_addresses = pd.factorize(pd.concat([df['from'], df['to']], ignore_index=True))
+    df['source'], df['target'] = codes[:len(df)], codes[len(df):]
+
+    incoming_counts = np.bincount(df['target'], minlength=len(unique_addresses))
+    outgoing_counts = np.bincount(df['source'], minlength=len(unique_addresses))
+    labels = [(node[:6]+'...'+node[-4:] if node != 'Other' else node) + f' - Incoming: {incoming}, Outgoing: {outgoing}'
+              for node, incoming, outgoing in zip(unique_addresses, incoming_counts, outgoing_counts)]
+
+    # One link per (source, target) - at most 26 x 26 links whatever the number of transactions
+    links = df.groupby(['source', 'target']).agg(value=('value', 'sum'), transactions=('hash', 'count'),
+                                                 first=('timeStamp', 'min'), last=('timeStamp', 'max'),
+                                                 methods=('methodId', 'nunique'), method=('methodId', 'first')).reset_index()
+    links['method'] = links['method'].astype(str).where(links['methods'] == 1, 'Mixed')
+    for column in ['first', 'last']:
+        links[column] = pd.to_datetime(links[column], unit='s').dt.strftime('%H:%M:%S %m/%d/%Y')
     
-
     fig = go.Figure(data=[go.Sankey(
         arrangement = "snap",
         node = 
@@ -442,12 +323,12 @@ def eth_sankey(df, address):
     link = dict(
         line = dict(color = "rgba(182,190,200, 0.8)", width =1),
         #arrowlen=50,
-        source = df['from'].apply(lambda x: np.where(unique_addresses == x)[0][0]).values, 
-        target = df['to'].apply(lambda x: np.where(unique_addresses == x)[0][0]).values,
-        value = df['value'],
-        customdata = df[['hash', 'timeStamp', 'methodId']].values,
-        hovertemplate='<b>Transaction Details</b>: <br />Transaction Hash: %{customdata[0]}<br />'+
-        'Timestamp: %{customdata[1]}<br />Amount: <b>%{value:.9f} ETH</b><br />Type: <b>%{customdata[2]}</b><extra></extra>',
+        source = links['source'].to_numpy(),
+        target = links['target'].to_numpy(),
+        value = links['value'].to_numpy(),
+        customdata = links[['transactions', 'first', 'last', 'method']].to_numpy(),
+        hovertemplate='<b>Transaction Details</b>: <br />Transactions: %{customdata[0]}<br />'+
+        'First: %{customdata[1]}<br />Last: %{customdata[2]}<br />Amount: <b>%{value:.9f} ETH</b><br />Type: <b>%{customdata[3]}</b><extra></extra>',
     ))])
 
     fig.update_layout(
@@ -475,9 +356,12 @@ def eth_sankey(df, address):
 def main(address):
     address = address.lower()
     api_key = get_api_key()
-    balance = get_balance(address, api_key)
-    trx_eth = get_transactions_eth(address, api_key)
-    trx_erc20 = get_transactions_erc20(address, api_key)
+    # Balance, ETH and ERC20 transactions fetched in parallel - the api.etherscan.io bucket paces the calls
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        balance = executor.submit(get_balance, address, api_key)
+        trx_eth = executor.submit(get_transactions_eth, address, api_key)
+        trx_erc20 = executor.submit(get_transactions_erc20, address, api_key)
+        balance, trx_eth, trx_erc20 = balance.result(), trx_eth.result(), trx_erc20.result()
 
     if not trx_eth:
         st.error("Warning: No transactions found for this address.")
@@ -489,13 +373,17 @@ def main(address):
     if not trx_eth and not trx_erc20:
         return
     
+    # Records parsed once - every table and chart below reads the same typed frames
+    df_eth = dataframe_clearing(address, trx_eth)
+    df_erc20 = dataframe_clearing(address, trx_erc20)
+    df_holdings = holdings_erc20(address, df_erc20, major_token_filter = True)
 
     balance_container = st.container()
     with balance_container:
         st.markdown(f"#### Balance: **{balance:.9f} ETH**" )
     if trx_erc20:
         st.markdown(f"#### ECR 20 Balance (Stables Only):" )
-        st.dataframe(holdings_erc20(address, dataframe_clearing(address, trx_erc20), major_token_filter = True),
+        st.dataframe(df_holdings,
     column_config={
         "Amount In": st.column_config.NumberColumn(
             "Amount In",
@@ -524,35 +412,35 @@ def main(address):
     tab1, tab2 = st.tabs([f"ETH Transactions Overview", "ERC20 Transactions Overview"])
     with tab1:
         if trx_eth:
-            st.dataframe(group_transactions(dataframe_clearing(address, trx_eth), address, 'ETH').style.apply(highlight_address, address=user_input, column=['to']), use_container_width=True, hide_index=True)
+            st.dataframe(group_transactions(df_eth, address, 'ETH').style.apply(highlight_address, address=user_input, column=['to']), use_container_width=True, hide_index=True)
             
         if not trx_eth:
             st.write('No ETH transactions found for this address')
     with tab2:
         if trx_erc20:
-            st.dataframe(group_transactions(dataframe_clearing(address, trx_erc20), address, 'ERC20').style.apply(highlight_address, address=user_input, column=['to']), use_container_width=True, hide_index=True)
+            st.dataframe(group_transactions(df_erc20, address, 'ERC20').style.apply(highlight_address, address=user_input, column=['to']), use_container_width=True, hide_index=True)
             
         if not trx_erc20:
             st.write('No ERC-20 transactions found for this address')
 
     st.divider()
     st.caption('''
-    **Wallet Transactions ETH - Sankey Chart:** This function creates a Sankey diagram to visualize the flow of Ether between different Ethereum addresses. The 'from' and 'to' addresses are grouped into 'Top 25' and 'Other', based on the total absolute value of transactions associated with each address. This visualization provides an overview of the transaction activities for a given Ethereum address.
+    **Wallet Transactions ETH - Sankey Chart:** This function creates a Sankey diagram to visualize the flow of Ether between different Ethereum addresses. The 'from' and 'to' addresses are grouped into 'Top 25' and 'Other', based on the total absolute value of transactions associated with each address. Transactions between the same two addresses are summed into one link. This visualization provides an overview of the transaction activities for a given Ethereum address.
 
     ''')
-    st.plotly_chart(eth_sankey(dataframe_clearing(address, trx_eth), address), theme=None, use_container_width=True)
+    st.plotly_chart(eth_sankey(df_eth.copy(), address), theme=None, use_container_width=True)
     st.divider()
     if trx_erc20:
         st.caption('''
         **Wallet Transactions ERC20 Tokens - Sankey Chart:** This function generates a Sankey diagram to visualize the flow of ERC20 tokens from "Amount In" to the specific token and then to "Amount Out" or "Current Holdings".
 
         ''')
-        st.plotly_chart(erc20_sankey(holdings_erc20(address, dataframe_clearing(address, trx_erc20), major_token_filter = True), address), theme=None, use_container_width=True)
+        st.plotly_chart(erc20_sankey(df_holdings, address), theme=None, use_container_width=True)
         st.caption('''
         **ERC20 Tokens Distribution - Pie Chart:** This function generates a 1-row, 3-column subplot with pie charts illustrating the amount in, amount out, and current holdings of ERC20 tokens for a given Ethereum address.
 
         ''')
-        st.plotly_chart(erc20_pies(holdings_erc20(address, dataframe_clearing(address, trx_erc20), major_token_filter = True), address), theme=None, use_container_width=True)
+        st.plotly_chart(erc20_pies(df_holdings, address), theme=None, use_container_width=True)
     st.divider()
 
 # Streamlit Settings - Before calling main
@@ -0,0 +1,119 @@
+import sqlite3
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from extras import logo_sidebar_lit, data_access, cross_asset, screener
+from pathlib import Path
+import os
+
+dir_path = Path(__file__).parent.resolve()
+db_path = dir_path / '..' / 'dbs' / 'trading_data.db'
+
+# Statistics are computed by the Binance feed after each ingestion (extras/cross_asset.py) - the page only reads them.
+# The screener ranks every pair on the SMA / RSI maintained by the feed (extras/screener.py).
+DEFAULT_ASSETS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT', 'DOGEUSDT', 'DOTUSDT']
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.dirname(script_dir)
+    logo_path = os.path.join(parent_dir, 'extras', 'logo.png')
+    st.set_page_config(page_title='🧮 Cross Asset Analytics - PyFiHub', page_icon='🌐', layout='wide', initial_sidebar_state='expanded')
+    st.markdown(logo_sidebar_lit(logo_path, height=159), unsafe_allow_html=True)
+
+    hide_menu_style = """
+        <style>
+            #MainMenu {visibility: hidden;}
+            button[title="View fullscreen"]{visibility: hidden;}
+            .css-15zrgzn {display: none}
+            section[data-testid="stSidebar"] .css-ng1t4o {{width: 14rem;}}
+            footer {visibility: hidden;}
+        </style>
+        """
+    st.markdown(hide_menu_style, unsafe_allow_html=True)
+
+    st.markdown(" ## Cross Asset Analytics")
+    st.markdown(
+        f"""
+        Correlation, beta against {cross_asset.BENCHMARK} and realized volatility of every Binance USDT pair, from daily log returns.
+        Correlations and betas cover the last {cross_asset.CORRELATION_WINDOW} days, volatility the last {cross_asset.VOLATILITY_WINDOW} days (annualized).
+        Updated daily after the historical data import.
+        """
+    )
+
+    try:
+        stats = data_access.read(db_path, cross_asset.latest_stats, "1d")
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        # No asset_stats / asset_correlations (or no trading_data.db) until the feed has computed them once
+        stats = pd.DataFrame()
+    if stats.empty:
+        st.warning("No analytics available yet - they are computed after the next Binance import.")
+        return
+
+    # Latest statistics of every pair
+    st.markdown("#### Latest statistics")
+    st.dataframe(
+        stats.rename(columns={'symbol': 'Asset', 'beta': f'Beta vs {cross_asset.BENCHMARK}',
+                              'correlation': f'Correlation vs {cross_asset.BENCHMARK}', 'volatility': 'Volatility'}),
+        column_config={
+            f'Beta vs {cross_asset.BENCHMARK}': st.column_config.NumberColumn(format="%.2f"),
+            f'Correlation vs {cross_asset.BENCHMARK}': st.column_config.NumberColumn(format="%.2f"),
+            'Volatility': st.column_config.NumberColumn(format="%.2f"),
+        },
+        hide_index=True, use_container_width=True)
+
+    # Correlation heatmap of a selection of pairs
+    assets = stats['symbol'].tolist()
+    st.markdown("#### Correlation matrix")
+    selected_assets = st.multiselect("Select assets", assets, default=[asset for asset in DEFAULT_ASSETS if asset in assets])
+    if len(selected_assets) > 1:
+        matrix = data_access.read(db_path, cross_asset.correlation_table, tuple(selected_assets), "1d")
+        fig = go.Figure(data=go.Heatmap(z=matrix.values, x=matrix.columns, y=matrix.index, zmin=-1, zmax=1,
+                                        colorscale='RdYlGn', text=matrix.round(2).values, texttemplate='%{text}'))
+        fig.update_layout(height=600, margin=dict(l=0, r=0, t=30, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+
+    # One pair - most / least correlated pairs and its rolling beta and volatility
+    st.markdown("#### Asset details")
+    default_index = assets.index(cross_asset.BENCHMARK) if cross_asset.BENCHMARK in assets else 0
+    selected_asset = st.selectbox("Select an asset", assets, index=default_index)
+
+    correlations = data_access.read(db_path, cross_asset.correlations_of, selected_asset, "1d")
+    col1, col2 = st.columns(2)
+    col1.write("Most correlated")
+    col1.dataframe(correlations.head(10), hide_index=True, use_container_width=True)
+    col2.write("Least correlated")
+    col2.dataframe(correlations.tail(10).iloc[::-1], hide_index=True, use_container_width=True)
+
+    history = data_access.read(db_path, cross_asset.symbol_history, selected_asset, "1d")
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=history['open_time'], y=history['beta'], name=f'Beta vs {cross_asset.BENCHMARK}'))
+    fig.add_trace(go.Scatter(x=history['open_time'], y=history['volatility'], name='Volatility', yaxis='y2'))
+    fig.update_layout(title=f'{selected_asset} - Rolling beta and volatility', hovermode='x unified',
+                      yaxis=dict(title='Beta'), yaxis2=dict(title='Volatility', overlaying='y', side='right'),
+                      margin=dict(l=0, r=0, t=30, b=0))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Screener - every pair filtered on its latest candles, conditions left empty are not applied
+    st.markdown("#### Screener")
+    col1, col2, col3, col4 = st.columns(4)
+    crossover = col1.selectbox("SMA 50 / 200 crossover", ["Any", "Crossed above", "Crossed below"])
+    within = col2.number_input("Within the last candles", min_value=1, max_value=screener.LOOKBACK - 1, value=5, disabled=crossover == "Any")
+    rsi_range = col3.slider("RSI", min_value=0, max_value=100, value=(0, 100))
+    min_volume_ratio = col4.number_input(f"Volume vs {screener.VOLUME_WINDOW} candle average (min)", min_value=0.0, value=0.0, step=0.5)
+    screened = data_access.read(db_path, screener.screen, "1d",
+                                within if crossover == "Crossed above" else None,
+                                within if crossover == "Crossed below" else None,
+                                rsi_range[1] if rsi_range[1] < 100 else None,
+                                rsi_range[0] if rsi_range[0] > 0 else None,
+                                min_volume_ratio or None)
+    st.dataframe(
+        screened.rename(columns={'rank': '#', 'symbol': 'Asset', 'close': 'Close', 'rsi': 'RSI', 'sma_50': 'SMA 50', 'sma_200': 'SMA 200',
+                                 'volume_ratio': 'Volume ratio', 'crossed_up': 'Candles since cross up', 'crossed_down': 'Candles since cross down'}),
+        column_config={
+            'RSI': st.column_config.NumberColumn(format="%.1f"),
+            'Volume ratio': st.column_config.NumberColumn(format="%.2f"),
+        },
+        hide_index=True, use_container_width=True)
+
+if __name__ == '__main__':
+    main()